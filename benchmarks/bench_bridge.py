@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 20:52:03 2026
+
+@author: 皓
+
+Measure Chariot end to end against a bridge hosting the stand-in CHR API.
+
+    python benchmarks/bench_bridge.py --output bench.json
+
+The bridge runs in a separate process (``python -m pychariot.bridge``) so
+every call pays the same rpyc round trip as against ChrApi.dll.
+"""
+import os
+import sys
+import json
+import time
+import platform
+import statistics
+import subprocess
+import os.path as osp
+from argparse import ArgumentParser
+
+ROOT = osp.dirname(osp.dirname(osp.abspath(__file__)))
+BENCH_DIR = osp.dirname(osp.abspath(__file__))
+sys.path.insert(0, ROOT)
+
+# pylint: disable=wrong-import-position
+from pychariot.chariot import Chariot, CHARIOT_VERSION  # noqa: E402
+from pychariot.pool import get_free_port, wait_port  # noqa: E402
+
+
+SCRIPT = osp.abspath(__file__)
+
+
+class StandinChariot(Chariot):
+    '''Chariot bound to standin_chrapi.LocalCHRAPI on the bridge'''
+
+    def connect(self, address):
+        self.startup_times = {}
+        with self.timing('connect'):
+            self.rpc = self.open_rpc(address, 'pychariot')
+            self.bridge = self.rpc.modules['pychariot.bridge']
+            self.ship_logs()
+        self.api = self.rpc.modules.standin_chrapi.LocalCHRAPI()
+        with self.timing('dispatch'):
+            self.build_dispatch()
+        with self.timing('initialize'):
+            self.api_initialize()
+
+
+def start_bridge(port):
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [ROOT, BENCH_DIR] + [x for x in [env.get('PYTHONPATH')] if x])
+    cmd = [sys.executable, '-m', 'pychariot.bridge', '--port', str(port)]
+    process = subprocess.Popen(cmd, env=env)  # pylint: disable=consider-using-with
+    if not wait_port(port, 30):
+        process.kill()
+        raise TimeoutError('Bridge did not start')
+    return process
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        'count': len(samples),
+        'mean_us': statistics.fmean(samples) * 1e6,
+        'p50_us': samples[len(samples) // 2] * 1e6,
+        'p99_us': samples[int(len(samples) * 0.99)] * 1e6,
+        'max_us': samples[-1] * 1e6,
+    }
+
+
+def bench_latency(chariot, calls):
+    '''单次调用往返时延'''
+    get_version = chariot.api_get_version
+    samples = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        get_version()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+def bench_getters(chariot, calls):
+    '''标量getter吞吐'''
+    pair = chariot.pair_new()
+    chariot.set_pair_addr(pair, '192.168.1.1', '192.168.1.2')
+    result = {}
+    for name in ('pair_get_e1_addr', 'pair_get_protocol',
+                 'common_results_get_meas_time'):
+        getter = getattr(chariot, name)
+        start = time.perf_counter()
+        for _ in range(calls):
+            getter(pair)
+        elapsed = time.perf_counter() - start
+        result[name] = {'calls': calls, 'seconds': elapsed,
+                        'calls_per_sec': calls / elapsed}
+    chariot.pair_delete(pair)
+    return result
+
+
+def build_test(chariot, count):
+    test = chariot.test_new()
+    for x in range(count):
+        pair = chariot.create_pair_attr(f'10.0.{x // 256}.{x % 256}',
+                                        '10.1.0.1', SCRIPT,
+                                        comment=f'pair {x}')
+        chariot.test_add_pair(test, pair)
+    return test
+
+
+def bench_build(chariot, sizes):
+    '''按pair数量构建测试的耗时'''
+    result = {}
+    tests = {}
+    for count in sizes:
+        start = time.perf_counter()
+        tests[count] = build_test(chariot, count)
+        elapsed = time.perf_counter() - start
+        result[str(count)] = {'seconds': elapsed,
+                              'pairs_per_sec': count / elapsed}
+    return result, tests
+
+
+def bench_clone(chariot, tests):
+    '''在桥接端复制测试的耗时'''
+    result = {}
+    for count, test in tests.items():
+        start = time.perf_counter()
+        clone = chariot.clone_test(test)
+        elapsed = time.perf_counter() - start
+        assert chariot.test_get_pair_count(clone) == count
+        result[str(count)] = {'seconds': elapsed,
+                              'pairs_per_sec': count / elapsed}
+    return result
+
+
+def bench_extract(chariot, tests):
+    '''结果提取吞吐, 对比逐个调用与桥接端批量计算'''
+    result = {}
+    for count, test in tests.items():
+        pairs = chariot.get_pairs(test)
+        start = time.perf_counter()
+        total = sum(chariot.get_pair_bytes_all_e1(x) for x in pairs)
+        per_call = time.perf_counter() - start
+        start = time.perf_counter()
+        stats = chariot.get_pairs_stats(pairs)
+        batched = time.perf_counter() - start
+        start = time.perf_counter()
+        chariot.gather('CHR_common_results_get_bytes_sent_e1',
+                       ((x,) for x in pairs))
+        gathered = time.perf_counter() - start
+        assert total == stats.bytes_all_e1
+        result[str(count)] = {
+            'per_call_seconds': per_call,
+            'per_call_pairs_per_sec': count / per_call,
+            'stats_seconds': batched,
+            'stats_pairs_per_sec': count / batched,
+            'gather_seconds': gathered,
+            'gather_values_per_sec': count / gathered,
+        }
+    return result
+
+
+def main():
+    parser = ArgumentParser(description='pychariot bridge benchmark')
+    parser.add_argument('--transport', default='tcp',
+                        choices=('tcp', 'unix', 'pipe', 'auto'))
+    parser.add_argument('--calls', type=int, default=2000)
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10, 100, 1000, 10000])
+    parser.add_argument('--output', '-o', default=None,
+                        help='JSON file, defaults to stdout')
+    args = parser.parse_args()
+
+    port = get_free_port()
+    process = start_bridge(port)
+    try:
+        chariot = StandinChariot('localhost', transport=args.transport,
+                                 port=port)
+        built, tests = bench_build(chariot, args.sizes)
+        report = {
+            'pychariot': '.'.join(str(x) for x in CHARIOT_VERSION),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'transport': chariot.transport.NAME,
+            'startup': chariot.startup_times,
+            'latency': bench_latency(chariot, args.calls),
+            'getters': bench_getters(chariot, args.calls),
+            'build': built,
+            'clone': bench_clone(chariot, tests),
+            'extract': bench_extract(chariot, tests),
+        }
+        chariot.stop_rpc(stop_server=False)
+    finally:
+        process.terminate()
+        process.wait(5)
+
+    text = json.dumps(report, indent=2)
+    if args.output is None:
+        print(text)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 23:48:27 2026
+
+@author: 皓
+
+Measure decoding of enum return values.
+
+    python benchmarks/bench_enum.py --count 5000 --repeat 200
+
+Compares calling the IntEnum class with the lookup table decoder and with
+decode_array, for a column of pair run statuses.
+"""
+import sys
+import json
+import time
+import random
+import platform
+import os.path as osp
+from argparse import ArgumentParser
+
+sys.path.insert(0, osp.dirname(osp.dirname(osp.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from pychariot.const import CHR_PAIR_RUNSTATUS_TYPE  # noqa: E402
+from pychariot.common import decoder, decode_array  # noqa: E402
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def timed(func, values, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(values)
+    elapsed = time.perf_counter() - start
+    count = len(values) * repeat
+    return {'seconds': elapsed, 'values_per_sec': count / elapsed,
+            'ns_per_value': elapsed / count * 1e9}
+
+
+def main():
+    parser = ArgumentParser(description='pychariot enum decoding benchmark')
+    parser.add_argument('--count', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=200)
+    parser.add_argument('--output', '-o', default=None,
+                        help='JSON file, defaults to stdout')
+    args = parser.parse_args()
+
+    datatype = CHR_PAIR_RUNSTATUS_TYPE
+    choices = [x.value for x in datatype]
+    values = [random.choice(choices) for _ in range(args.count)]
+    decode = decoder(datatype)
+    results = {
+        'enum_call': timed(lambda v: [datatype(x) for x in v], values,
+                           args.repeat),
+        'decoder': timed(lambda v: [decode(x) for x in v], values,
+                         args.repeat),
+        'decode_array_list': timed(lambda v: decode_array(datatype, v),
+                                   values, args.repeat),
+    }
+    if np is not None:
+        results['decode_array_numpy'] = timed(
+            lambda v: decode_array(datatype, v), np.array(values, dtype='i'),
+            args.repeat)
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'count': args.count,
+        'repeat': args.repeat,
+        'results': results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output is None:
+        print(text)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(text)
+
+
+if __name__ == '__main__':
+    main()
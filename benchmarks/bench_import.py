@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 23:58:09 2026
+
+@author: 皓
+
+Measure the import time of pychariot modules in fresh interpreters.
+
+    python benchmarks/bench_import.py --repeat 20
+
+Each sample runs a new interpreter, so the times include reading the
+cached bytecode but not interpreter startup.
+"""
+import sys
+import json
+import platform
+import statistics
+import subprocess
+import os.path as osp
+from argparse import ArgumentParser
+
+ROOT = osp.dirname(osp.dirname(osp.abspath(__file__)))
+
+MODULES = ('pychariot', 'pychariot.const', 'pychariot.chariot',
+           'pychariot.chrapi', 'pychariot.wrapper', 'pychariot32',
+           'pychariot32.chrapi', 'pychariot32.wrapper')
+# import *name* and print the seconds it took
+CODE = ('import sys, time; sys.path.insert(0, {root!r}); '
+        'start = time.perf_counter(); import {name}; '
+        'print(time.perf_counter() - start)')
+
+
+def sample(name):
+    cmd = [sys.executable, '-c', CODE.format(root=ROOT, name=name)]
+    result = subprocess.run(cmd, capture_output=True, text=True, check=False)
+    if result.returncode != 0:
+        lines = result.stderr.strip().splitlines()
+        raise RuntimeError(lines[-1] if lines else 'import failed')
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def measure(name, repeat):
+    '''多次导入name, 返回耗时统计或错误'''
+    try:
+        # the first run may write the bytecode cache
+        sample(name)
+        samples = sorted(sample(name) for _ in range(repeat))
+    except RuntimeError as ex:
+        return {'module': name, 'error': str(ex)}
+    return {
+        'module': name,
+        'count': len(samples),
+        'min_ms': samples[0] * 1e3,
+        'median_ms': statistics.median(samples) * 1e3,
+        'max_ms': samples[-1] * 1e3,
+    }
+
+
+def main():
+    parser = ArgumentParser(description='pychariot import time benchmark')
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--modules', nargs='+', default=list(MODULES))
+    parser.add_argument('--output', '-o', default=None,
+                        help='JSON file, defaults to stdout')
+    args = parser.parse_args()
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': [measure(x, args.repeat) for x in args.modules],
+    }
+    text = json.dumps(report, indent=2)
+    if args.output is None:
+        print(text)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 21:36:15 2026
+
+@author: 皓
+
+Measure the memory used by wrapper objects.
+
+    python benchmarks/bench_memory.py --count 1000000
+
+Creating a PairTimingRecord does not call ChrApi.dll, only the import of
+pychariot.wrapper has to succeed.
+"""
+import gc
+import sys
+import json
+import time
+import platform
+import tracemalloc
+import os.path as osp
+from argparse import ArgumentParser
+
+sys.path.insert(0, osp.dirname(osp.dirname(osp.abspath(__file__))))
+
+# pylint: disable=wrong-import-position
+from pychariot import wrapper  # noqa: E402
+
+
+def measure(cls, count, first_handle=1):
+    '''创建count个对象, 返回耗时和内存占用'''
+    handles = range(first_handle, first_handle + count)
+    gc.collect()
+    start = time.perf_counter()
+    objects = [cls(x) for x in handles]
+    elapsed = time.perf_counter() - start
+    del objects
+    gc.collect()
+    # tracemalloc slows allocation down, so time and memory are separate runs
+    tracemalloc.start()
+    objects = [cls(x) for x in handles]
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    result = {
+        'class': cls.__name__,
+        'count': count,
+        'seconds': elapsed,
+        'objects_per_sec': count / elapsed,
+        'bytes': current,
+        'peak_bytes': peak,
+        'bytes_per_object': current / count,
+        'sizeof': sys.getsizeof(objects[0]),
+        'has_dict': hasattr(objects[0], '__dict__'),
+        'identity_map_size': len(wrapper.HANDLE_OBJECTS),
+    }
+    del objects
+    gc.collect()
+    return result
+
+
+def main():
+    parser = ArgumentParser(description='pychariot wrapper memory benchmark')
+    parser.add_argument('--count', type=int, default=1000000)
+    parser.add_argument('--output', '-o', default=None,
+                        help='JSON file, defaults to stdout')
+    args = parser.parse_args()
+
+    report = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': [measure(wrapper.PairTimingRecord, args.count),
+                    measure(wrapper.TimingRecord, args.count)],
+    }
+    text = json.dumps(report, indent=2)
+    if args.output is None:
+        print(text)
+    else:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(text)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 20:14:26 2026
+
+@author: 皓
+"""
+# pylint: disable=invalid-name,unused-argument
+import itertools
+
+
+CHR_OK = 0
+CHR_HANDLE_INVALID = 113
+
+
+class LocalCHRAPI:
+    '''
+    A stand-in for CHRAPI keeping objects in memory.
+
+    Functions return the same (rc, *out) tuples as the ctypes wrappers so
+    Chariot and the bridge helpers can be measured without ChrApi.dll.
+    '''
+
+    def __init__(self, timing_records=10):
+        self.handles = itertools.count(1)
+        self.objects = {}
+        self.timing_records = timing_records
+
+    def new_object(self, kind, **fields):
+        handle = next(self.handles)
+        self.objects[handle] = dict(fields, kind=kind)
+        return handle
+
+    def get_field(self, handle, name):
+        obj = self.objects.get(handle)
+        if obj is None:
+            return CHR_HANDLE_INVALID, None
+        return CHR_OK, obj.get(name)
+
+    def set_field(self, handle, name, value):
+        obj = self.objects.get(handle)
+        if obj is None:
+            return CHR_HANDLE_INVALID
+        obj[name] = value
+        return CHR_OK
+
+    def has_func(self, attr):
+        return hasattr(self, attr)
+
+    #  API Utility Functions
+
+    def CHR_api_initialize(self, detail_level):
+        return CHR_OK, ''
+
+    def CHR_api_get_version(self):
+        return CHR_OK, '7.10 standin'
+
+    def CHR_api_get_return_msg(self, return_code):
+        return CHR_OK, f'return code {return_code}'
+
+    def CHR_common_error_get_info(self, handle, detail):
+        return CHR_OK, ''
+
+    #  Test Object Functions
+
+    def CHR_test_new(self):
+        runopts = self.new_object('runopts', test_duration=60, test_end=0)
+        dgopts = self.new_object('dgopts', retrans_count=0)
+        return CHR_OK, self.new_object('test', pairs=[], runopts=runopts,
+                                       dgopts=dgopts)
+
+    def CHR_test_delete(self, test):
+        obj = self.objects.pop(test, None)
+        if obj is None:
+            return CHR_HANDLE_INVALID
+        # the test owns its options and pairs
+        for handle in [obj['runopts'], obj['dgopts']] + obj['pairs']:
+            self.objects.pop(handle, None)
+        return CHR_OK
+
+    def CHR_test_add_pair(self, test, pair):
+        rc, pairs = self.get_field(test, 'pairs')
+        if rc == CHR_OK:
+            pairs.append(pair)
+        return rc
+
+    def CHR_test_get_pair_count(self, test):
+        rc, pairs = self.get_field(test, 'pairs')
+        return rc, len(pairs) if pairs is not None else 0
+
+    def CHR_test_get_pair(self, test, index):
+        rc, pairs = self.get_field(test, 'pairs')
+        if rc != CHR_OK or index >= len(pairs):
+            return CHR_HANDLE_INVALID, 0
+        return CHR_OK, pairs[index]
+
+    def CHR_test_get_mgroup_count(self, test):
+        return self.get_field(test, 'mgroup_count')[0], 0
+
+    def CHR_test_get_app_group_count(self, test):
+        return self.get_field(test, 'app_group_count')[0], 0
+
+    def CHR_test_get_runopts(self, test):
+        return self.get_field(test, 'runopts')
+
+    def CHR_test_get_dgopts(self, test):
+        return self.get_field(test, 'dgopts')
+
+    def CHR_test_start(self, test):
+        return CHR_OK
+
+    def CHR_test_query_stop(self, test, timeout):
+        return CHR_OK
+
+    #  Run Options and Datagram Options Object Functions
+
+    def CHR_runopts_get_test_duration(self, runopts):
+        return self.get_field(runopts, 'test_duration')
+
+    def CHR_runopts_set_test_duration(self, runopts, duration):
+        return self.set_field(runopts, 'test_duration', duration)
+
+    def CHR_runopts_get_test_end(self, runopts):
+        return self.get_field(runopts, 'test_end')
+
+    def CHR_runopts_set_test_end(self, runopts, test_end):
+        return self.set_field(runopts, 'test_end', test_end)
+
+    def CHR_dgopts_get_retrans_count(self, dgopts):
+        return self.get_field(dgopts, 'retrans_count')
+
+    def CHR_dgopts_set_retrans_count(self, dgopts, count):
+        return self.set_field(dgopts, 'retrans_count', count)
+
+    #  Pair Object Functions
+
+    def CHR_pair_new(self):
+        return CHR_OK, self.new_object('pair', e1_addr='', e2_addr='',
+                                       script_filename='', comment='',
+                                       protocol=0)
+
+    def CHR_pair_delete(self, pair):
+        return CHR_OK if self.objects.pop(pair, None) else CHR_HANDLE_INVALID
+
+    def CHR_pair_copy(self, to_pair, from_pair):
+        source = self.objects.get(from_pair)
+        if source is None or to_pair not in self.objects:
+            return CHR_HANDLE_INVALID
+        self.objects[to_pair].update(source)
+        return CHR_OK
+
+    def CHR_pair_swap_endpoints(self, pair):
+        obj = self.objects.get(pair)
+        if obj is None:
+            return CHR_HANDLE_INVALID
+        obj['e1_addr'], obj['e2_addr'] = obj['e2_addr'], obj['e1_addr']
+        return CHR_OK
+
+    def CHR_pair_get_e1_addr(self, pair):
+        return self.get_field(pair, 'e1_addr')
+
+    def CHR_pair_set_e1_addr(self, pair, value):
+        return self.set_field(pair, 'e1_addr', value)
+
+    def CHR_pair_get_e2_addr(self, pair):
+        return self.get_field(pair, 'e2_addr')
+
+    def CHR_pair_set_e2_addr(self, pair, value):
+        return self.set_field(pair, 'e2_addr', value)
+
+    def CHR_pair_get_comment(self, pair):
+        return self.get_field(pair, 'comment')
+
+    def CHR_pair_set_comment(self, pair, value):
+        return self.set_field(pair, 'comment', value)
+
+    def CHR_pair_get_protocol(self, pair):
+        return self.get_field(pair, 'protocol')
+
+    def CHR_pair_set_protocol(self, pair, value):
+        return self.set_field(pair, 'protocol', value)
+
+    def CHR_pair_get_script_filename(self, pair):
+        return self.get_field(pair, 'script_filename')
+
+    def CHR_pair_use_script_filename(self, pair, filename):
+        return self.set_field(pair, 'script_filename', filename)
+
+    def CHR_pair_get_runStatus(self, pair):
+        if pair not in self.objects:
+            return CHR_HANDLE_INVALID, 0
+        return CHR_OK, pair % 10
+
+    def CHR_pair_get_timing_record_count(self, pair):
+        if pair not in self.objects:
+            return CHR_HANDLE_INVALID, 0
+        return CHR_OK, self.timing_records
+
+    def CHR_pair_get_timing_record(self, pair, index):
+        if pair not in self.objects:
+            return CHR_HANDLE_INVALID, 0
+        return CHR_OK, pair * 1000 + index
+
+    #  Results Extraction Functions
+
+    def CHR_timingrec_get_elapsed(self, record):
+        return CHR_OK, (record % 1000 + 1) * 1.0
+
+    def CHR_common_results_get_meas_time(self, handle):
+        return CHR_OK, float(self.timing_records)
+
+    def CHR_common_results_get_bytes_sent_e1(self, handle):
+        return CHR_OK, handle * 1000
+
+    def CHR_common_results_get_bytes_recv_e1(self, handle):
+        return CHR_OK, handle * 10
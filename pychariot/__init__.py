@@ -1,12 +1,46 @@
 # -*- coding: utf-8 -*-
-from .const import (RetureCode, CHR_NULL_HANDLE, CHR_BOOLEAN,
-                    CHR_PROTOCOL, CHR_QOS_TEMPLATE_TYPE, CHR_VOIP_CODEC,
-                    CHR_VIDEO_CODEC, CHR_DETAIL_LEVEL, CHR_THROUGHPUT_UNITS,
-                    CHR_TEST_END, CHR_TEST_HOW_ENDED, CHR_TEST_REPORTING,
-                    CHR_TEST_REPORTING_FIREWALL, CHR_TEST_RETRIEVING,
-                    CHR_RESULTS, CHR_CFG_PARM,
-                    CHR_TRACERT_RUNSTATUS_TYPE, CHR_PAIR_RUNSTATUS_TYPE,
-                    CHR_MEASURE_STATS, CHR_PAIR_TYPE, CHR_LICENSE_TYPE,
-                    CHR_REPORT_ITEM, CHR_GROUPING_TYPE, CHR_SORT_ORDER)
-from .chariot import Chariot, CHARIOT_VERSION, Status
-__version__ = '.'.join([str(x) for x in CHARIOT_VERSION])
+"""
+Names are resolved lazily, so importing the package costs little until
+Chariot or a submodule is used.
+"""
+from importlib import import_module
+
+SUBMODULES = frozenset((
+    'bridge', 'chariot', 'chrapi', 'chrapi_defs', 'common', 'const', 'pool',
+    'serialize', 'spec', 'transport', 'utils', 'voip_defs', 'waiter',
+    'wrapper'))
+EXPORTS = dict.fromkeys((
+    'RetureCode', 'CHR_NULL_HANDLE', 'CHR_BOOLEAN',
+    'CHR_PROTOCOL', 'CHR_QOS_TEMPLATE_TYPE', 'CHR_VOIP_CODEC',
+    'CHR_VIDEO_CODEC', 'CHR_DETAIL_LEVEL',
+    'CHR_THROUGHPUT_UNITS', 'CHR_TEST_END',
+    'CHR_TEST_HOW_ENDED', 'CHR_TEST_REPORTING',
+    'CHR_TEST_REPORTING_FIREWALL', 'CHR_TEST_RETRIEVING',
+    'CHR_RESULTS', 'CHR_CFG_PARM',
+    'CHR_TRACERT_RUNSTATUS_TYPE', 'CHR_PAIR_RUNSTATUS_TYPE',
+    'CHR_MEASURE_STATS', 'CHR_PAIR_TYPE', 'CHR_LICENSE_TYPE',
+    'CHR_REPORT_ITEM', 'CHR_GROUPING_TYPE', 'CHR_SORT_ORDER'),
+    'const')
+EXPORTS.update(dict.fromkeys(('Chariot', 'CHARIOT_VERSION', 'Status'),
+             'chariot'))
+VERSION = ('chariot', 'CHARIOT_VERSION')
+__all__ = sorted(EXPORTS) + ['__version__']
+
+
+def __getattr__(name):
+    # submodules and exported names are imported on first access
+    if name in SUBMODULES:
+        return import_module(f'.{name}', __name__)
+    if name == '__version__':
+        module, attr = VERSION
+        value = '.'.join(str(x) for x in getattr(__getattr__(module), attr))
+    elif name in EXPORTS:
+        value = getattr(__getattr__(EXPORTS[name]), name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__) | SUBMODULES)
@@ -5,20 +5,30 @@ Created on Thu Apr  1 08:51:27 2021
 @author: 皓
 """
 # pylint: disable=import-outside-toplevel,too-many-public-methods,too-many-instance-attributes
-import sys
+import os
+import re
 import os.path as osp
 import logging
+import time
+import weakref
 from glob import glob
+from collections import namedtuple
+from contextlib import contextmanager
 from enum import IntEnum
 from platform import architecture
-from functools import lru_cache
-from .const import RetureCode, CHR_DETAIL_LEVEL, CHR_NULL_HANDLE
+from .const import (RetureCode, CHR_DETAIL_LEVEL, CHR_NULL_HANDLE,
+                    CHR_PAIR_RUNSTATUS_TYPE, BRIDGE_VERSION)
+from .transport import (TCPTransport, DEFAULT_PORT, LOCAL_ADDRESSES,
+                        get_transport)
 
 
 CHARIOT_VERSION = (0, 3, 0)
+CACHE_DIR = osp.join(osp.expanduser('~'), '.pychariot')
+BRIDGE_LOGGER = 'pychariot.bridge'
 
 
-def chr_api_wrapper(self, func):
+def chr_api_wrapper(self, func, name=None):
+    api_name = (name if name is not None else func.__name__)[4:]
 
     # @wraps(func)
     def wrapper(*args, **kwargs):
@@ -29,7 +39,6 @@ def chr_api_wrapper(self, func):
             rc = ret
             out = None
         if rc != RetureCode.CHR_OK:
-            api_name = func.__name__[4:]
             if not api_name.startswith('api'):
                 handle = args[0] if args else CHR_NULL_HANDLE
                 self.show_error(handle, rc, api_name)
@@ -41,6 +50,23 @@ def chr_api_wrapper(self, func):
     return wrapper
 
 
+class ErrorInfo:
+    '''扩展错误信息, 仅在日志实际输出时获取'''
+    __slots__ = ('chariot', 'handle', 'text')
+
+    def __init__(self, chariot, handle):
+        self.chariot = chariot
+        self.handle = handle
+        self.text = None
+
+    def __str__(self):
+        if self.text is None:
+            rc, info = self.chariot.CHR_common_error_get_info(
+                self.handle, CHR_DETAIL_LEVEL.CHR_DETAIL_LEVEL_ALL)
+            self.text = info if rc == RetureCode.CHR_OK else f'rc = {rc}'
+        return self.text
+
+
 class Status(IntEnum):
     OK = 0
     INIT = 1
@@ -48,18 +74,57 @@ class Status(IntEnum):
     RPC = 3
 
 
+class PairsStats(namedtuple('PairsStats',
+                            ('count', 'errors', 'elapsed_max', 'meas_time_max',
+                             'bytes_sent_e1', 'bytes_recv_e1'))):
+    '''桥接端一次计算的pairs汇总结果'''
+    __slots__ = ()
+
+    @property
+    def bytes_all_e1(self):
+        return self.bytes_sent_e1 + self.bytes_recv_e1
+
+    def average(self, measure=False):
+        '''总透传平均速率(Mbps), measure为True时按测量时间计算'''
+        time_max = self.meas_time_max if measure else self.elapsed_max
+        if time_max == 0:
+            return None
+        return self.bytes_all_e1 * 8e-6 / time_max
+
+
 class Chariot:
-    def __init__(self, address=None, status_callback=None):
+    # pylint: disable=too-many-arguments
+    def __init__(self, address=None, status_callback=None, keep_server=False,
+                 transport='auto', port=DEFAULT_PORT,
+                 log_interval=0.5, log_capacity=256):
         self.logger = logging.getLogger()
         self.address = address
         self.status_callback = status_callback
+        self.keep_server = keep_server
+        self.port = port
+        self.log_interval = log_interval
+        self.log_capacity = log_capacity
+        self.log_shipper = None
+        self.transport = get_transport(transport, port)
+        self.startup_times = {}
         self.status = Status.INIT
         self.python = None
         self.rpc_server = None
         self.pymodule = None
         self.rpc = None
         self.chrapi = None
+        self.bridge = None
+        self._api = None
+        self.api_names = frozenset()
+        self.dispatch = {}
+        # cached wrappers hold the chariot weakly, no reference cycle keeps
+        # it alive after its last reference is dropped
+        self.proxy = weakref.proxy(self)
+        self._waiter = None
         self.pairs = []
+        self.templates = {}
+        self.scripts = set()
+        self.messages = {}
         if address is not None:
             self.connect(self.address)
 
@@ -74,77 +139,275 @@ class Chariot:
             if self.status_callback:
                 self.status_callback(value)
 
+    @property
+    def api(self):
+        '''
+        API对象.
+
+        Over a bridge connection chrapi is imported on the bridge and the
+        API created on first use, not when connecting.
+        '''
+        if self._api is None and getattr(self, 'pymodule', None) is not None:
+            with self.timing('api'):
+                self.chrapi = self.pymodule.chrapi
+                self._api = self.chrapi.LocalCHRAPI()
+        return self._api
+
+    @api.setter
+    def api(self, value):
+        self._api = value
+
+    @property
+    def waiter(self):
+        '''首次等待时创建Waiter'''
+        if self._waiter is None:
+            from .waiter import Waiter
+            self._waiter = Waiter(self)
+        return self._waiter
+
+    @contextmanager
+    def timing(self, phase):
+        '''记录启动阶段耗时'''
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.startup_times[phase] = time.perf_counter() - start
+
+    def report_startup(self):
+        if not self.startup_times:
+            return
+        phases = ', '.join(f'{name}={value:.3f}s'
+                           for name, value in self.startup_times.items())
+        self.logger.info("Chariot startup: %s", phases)
+
     def connect(self, address):
-        if address in ('localhost', '127.0.0.1'):
-            arch, ost = architecture()
-            if not ost == 'WindowsPE':
-                raise OSError('The OS must be based on Windows NT.')
+        self.startup_times = {}
+        arch, ost = architecture()
+        if address in LOCAL_ADDRESSES and ost == 'WindowsPE':
             if arch == '64bit':
                 self.status = Status.RPC
-                self.start_rpc()
-                self.connect_rpcpy32(address)
+                self.start_rpc(address)
+                if getattr(self, 'rpc', None) is None:
+                    with self.timing('connect'):
+                        self.connect_rpcpy32(address)
                 self.status = Status.API
-                self.api = self.chrapi.LocalCHRAPI()
             else:
-                from . import chrapi
+                from . import chrapi, bridge
                 self.chrapi = chrapi
+                self.bridge = bridge
                 self.status = Status.API
-                self.api = self.chrapiLocalCHRAPI()
-            self.api_dir.cache_clear()
+                self.api = self.chrapi.LocalCHRAPI()
         else:
             self.status = Status.API
             self.connect_rpc(address)
-            self.api = self.chrapi.LocalCHRAPI()
+        # the API table is read on the first call
+        self.api_names = None
         self.status = Status.OK
+        self.report_startup()
+
+    def connect_bridge(self, address, package):
+        '''
+        直接连接已运行的桥接进程.
+
+        Used for pool workers: the probe, install and restart of the shared
+        rpcpy32 server are skipped.
+        '''
+        self.startup_times = {}
+        self.status = Status.RPC
+        with self.timing('connect'):
+            if package == 'pychariot32':
+                self.connect_rpcpy32(address)
+            else:
+                self.connect_rpc(address)
+        self.status = Status.API
+        self.api_names = None
+        self.status = Status.OK
+        self.report_startup()
 
-    def start_rpc(self):
-        if self.chrapi is not None:
+    def start_rpc(self, address='localhost'):
+        if getattr(self, 'rpc', None) is not None:
+            return
+        with self.timing('probe'):
+            conn = self.probe_rpcpy32(address)
+        if conn is not None:
+            self.bind_rpcpy32(conn)
             return
         self.restart_rpc()
 
+    def probe_rpcpy32(self, address):
+        '''复用已运行且版本匹配的rpcpy32服务'''
+        try:
+            conn = self.open_rpc(address, 'pychariot32')
+        except OSError:
+            return None
+        try:
+            remote = conn.modules.pychariot32.__version__
+            # installs older than the bridge module can not be bound
+            _bridge = conn.modules['pychariot32.bridge']
+        except Exception:  # pylint: disable=broad-except
+            remote = None
+        if (remote != self.get_pychariot32_version()
+                or not self.is_install_current()):
+            conn.close()
+            return None
+        self.logger.debug("Reuse running pychariot32 %s", remote)
+        return conn
+
+    @staticmethod
+    def get_pychariot32_version():
+        return '.'.join([str(x) for x in BRIDGE_VERSION])
+
+    def is_install_current(self):
+        '''上次安装的wheel与当前wheel的hash一致'''
+        whl = self.get_pychariot32_path()
+        if not whl:
+            return True
+        marker = self.read_marker() or ''
+        return marker.split(':')[0] == self.get_file_hash(whl)
+
     def get_pychariot32_path(self):
         whls = glob(osp.join(osp.dirname(__file__), '*.whl'))
         if whls:
             return whls[0]
         return None
 
+    @staticmethod
+    def get_file_hash(path):
+        import hashlib
+        sha256 = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 16), b''):
+                sha256.update(chunk)
+        return sha256.hexdigest()
+
+    def get_install_marker(self):
+        whl = self.get_pychariot32_path()
+        if not whl:
+            return None
+        rpcpy32_version = getattr(self.python, '__version__', '')
+        return f'{self.get_file_hash(whl)}:{rpcpy32_version}'
+
+    @classmethod
+    def get_marker_path(cls):
+        '''每个桥接版本一个标记, 版本改变后必须重新安装'''
+        return osp.join(CACHE_DIR,
+                        f'pychariot32-{cls.get_pychariot32_version()}.marker')
+
+    def read_marker(self):
+        try:
+            with open(self.get_marker_path(), encoding='utf-8') as f:
+                return f.read().strip()
+        except OSError:
+            return None
+
+    def write_marker(self, marker):
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(self.get_marker_path(), 'w', encoding='utf-8') as f:
+                f.write(marker)
+        except OSError as ex:
+            self.logger.warning("Unable to write install marker: %s", ex)
+
+    def install_pychariot32(self):
+        marker = self.get_install_marker()
+        if marker is not None and marker == self.read_marker():
+            return
+        # the wheel changed since the last install: install it even if the
+        # installed version looks current, the version alone can not tell
+        whl = self.get_pychariot32_path()
+        if whl:
+            result = self.rpc_server.pip_install(whl)
+            if not self.pip_succeeded(result):
+                raise RuntimeError(f'Unable to install {whl}: {result}')
+        if marker is not None:
+            self.write_marker(marker)
+
+    @staticmethod
+    def pip_succeeded(result):
+        '''pip_install的结果是否成功, 返回码, bool或CompletedProcess'''
+        if result is None:
+            # no status reported
+            return True
+        if isinstance(result, bool):
+            return result
+        return getattr(result, 'returncode', result) == 0
+
     def restart_rpc(self):
         import rpcpy32
         self.stop_rpc()
         self.python = rpcpy32
         self.rpc_server = self.python.RPC_SERVER
-        rpc_pip_list = self.rpc_server.pip_list()
-        if 'pychariot32' not in rpc_pip_list:
-            whl = self.get_pychariot32_path()
-            if whl:
-                self.rpc_server.pip_install(whl)
-        else:
-            from .chrapi import CHR_API_VERSION
-            installed = rpc_pip_list['pychariot32']
-            version = '.'.join([str(x) for x in CHR_API_VERSION])
-            if version > installed:
-                whl = self.get_pychariot32_path()
-                if whl:
-                    self.rpc_server.pip_install(whl)
-        self.rpc_server.start()
+        with self.timing('install'):
+            self.install_pychariot32()
+        with self.timing('server'):
+            self.rpc_server.start()
+
+    def open_rpc(self, address, package):
+        '''按传输方式建立到桥接服务的连接'''
+        bootstrap = TCPTransport(self.port)
+        transport = self.transport
+        if not transport.LOCAL or address not in LOCAL_ADDRESSES:
+            return bootstrap.connect(address)
+        try:
+            return transport.connect(address)
+        except OSError:
+            pass
+        conn = bootstrap.connect(address)
+        try:
+            transport.serve(conn, package)
+            local_conn = transport.connect(address)
+        except Exception as ex:  # pylint: disable=broad-except
+            self.logger.debug("Transport %s unavailable, use tcp: %s",
+                              transport.NAME, ex)
+            return conn
+        conn.close()
+        return local_conn
 
     def connect_rpcpy32(self, address):
-        import rpyc
-        self.rpc = rpyc.classic.connect(address)
+        self.bind_rpcpy32(self.open_rpc(address, 'pychariot32'))
+
+    def bind_rpcpy32(self, conn):
+        self.rpc = conn
         self.pymodule = self.rpc.modules.pychariot32
-        self.rpc.modules.sys.stdout = sys.stdout
-        self.rpc.modules.sys.stderr = sys.stderr
-        self.chrapi = self.pymodule.chrapi
+        self.bridge = self.rpc.modules['pychariot32.bridge']
+        self.ship_logs()
 
     def connect_rpc(self, address):
-        import rpyc
-        self.rpc = rpyc.classic.connect(address)
+        self.rpc = self.open_rpc(address, 'pychariot')
         self.pymodule = self.rpc.modules.pychariot
-        self.rpc.modules.sys.stdout = sys.stdout
-        self.rpc.modules.sys.stderr = sys.stderr
-        self.chrapi = self.pymodule.chrapi
+        self.bridge = self.rpc.modules['pychariot.bridge']
+        self.ship_logs()
+
+    def ship_logs(self):
+        '''桥接端日志按批次转发到本地logging'''
+        self.log_shipper = self.bridge.ship_logs(
+            self.receive_logs, self.log_interval, self.log_capacity,
+            self.logger.getEffectiveLevel())
+
+    @staticmethod
+    def receive_logs(records):
+        for name, levelno, msg, created, exc_text in records:
+            if name == 'root':
+                logger = logging.getLogger(BRIDGE_LOGGER)
+            else:
+                logger = logging.getLogger(f'{BRIDGE_LOGGER}.{name}')
+            if not logger.isEnabledFor(levelno):
+                continue
+            logger.handle(logging.makeLogRecord({
+                'name': logger.name, 'levelno': levelno,
+                'levelname': logging.getLevelName(levelno), 'msg': msg,
+                'created': created, 'exc_text': exc_text}))
 
     def close_rpc(self):
+        shipper = getattr(self, 'log_shipper', None)
+        if shipper is not None and getattr(self, 'bridge', None) is not None:
+            try:
+                # only the shipper of this connection, others keep theirs
+                self.bridge.stop_logs(shipper)
+            except Exception:  # pylint: disable=broad-except
+                pass
+        self.log_shipper = None
         if hasattr(self.rpc, 'close'):
             self.rpc.close()
         self.clear_attr('rpc')
@@ -158,44 +421,146 @@ class Chariot:
         except AttributeError:
             pass
 
-    def stop_rpc(self):
-        if self.rpc is not None:
+    def stop_rpc(self, stop_server=True):
+        if getattr(self, 'rpc', None) is not None:
             self.close_rpc()
         rpc_server = getattr(self, 'rpc_server', None)
-        if rpc_server is not None:
+        if rpc_server is not None and stop_server:
             rpc_server.stop()
-        for item in ('chrapi', 'pymodule', 'rpc_server', 'python'):
+        for item in ('chrapi', 'bridge', 'pymodule', 'rpc_server', 'python'):
             self.clear_attr(item)
+        self.api = None
+        self.api_names = frozenset()
+        self.dispatch = {}
+
+    def close(self):
+        '''关闭连接, keep_server为False时同时停止rpcpy32服务'''
+        waiter = getattr(self, '_waiter', None)
+        if waiter is not None:
+            waiter.cancel_all()
+        self.stop_rpc(not getattr(self, 'keep_server', False))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def __del__(self):
-        self.stop_rpc()
+        self.close()
+
+    def build_dispatch(self):
+        '''
+        每个连接读取一次API函数表, 函数在首次访问时绑定并缓存.
+
+        The table of the DLL and version (CHRAPI.functions) is used when
+        the API provides one, and common.FALLBACKS replace missing
+        functions.
+        '''
+        from .common import FALLBACKS, fallback_function
+        names = getattr(self.api, 'functions', None)
+        if names is None:
+            names = dir(self.api)
+        self.api_names = frozenset(x for x in names if x.startswith('CHR_'))
+        self.dispatch = {}
+        for name in FALLBACKS:
+            if name not in self.api_names:
+                func = fallback_function(self.api, name)
+                self.dispatch[name] = func
+                self.dispatch[name[4:]] = chr_api_wrapper(self.proxy, func)
+
+    def load_dispatch(self):
+        if self.api_names is None:
+            with self.timing('dispatch'):
+                self.build_dispatch()
 
-    @lru_cache()
     def api_dir(self):
-        return [x for x in dir(self.api) if x.startswith('CHR_')]
+        self.load_dispatch()
+        return sorted(self.api_names)
 
     def __dir__(self):
         return super().__dir__() + self.api_dir()
 
+    def bind_api(self, attr):
+        if attr.startswith('CHR_'):
+            if attr in self.api_names:
+                return getattr(self.api, attr)
+        else:
+            chr_name = f'CHR_{attr}'
+            if chr_name in self.api_names:
+                return chr_api_wrapper(self.proxy,
+                                       getattr(self.api, chr_name), chr_name)
+        return None
+
     def __getattr__(self, attr):
         classname = self.__class__.__name__
-        if attr not in ('_status', 'api'):
-            if hasattr(self, 'api'):
-                if attr.startswith('CHR_'):
-                    if hasattr(self.api, attr):
-                        return getattr(self.api, attr)
-                    classname = 'CHRAPI'
-                else:
-                    chr_name = f'CHR_{attr}'
-                    if hasattr(self.api, chr_name):
-                        func = getattr(self.api, chr_name)
-                        wrapper = chr_api_wrapper(self, func)
-                        return wrapper
+        dispatch = self.__dict__.get('dispatch')
+        if dispatch is not None and not attr.startswith('_'):
+            if self.__dict__.get('api_names', ()) is None:
+                self.load_dispatch()
+                dispatch = self.dispatch
+            func = dispatch.get(attr)
+            if func is not None:
+                return func
+            func = self.bind_api(attr)
+            if func is not None:
+                dispatch[attr] = func
+                return func
+            if attr.startswith('CHR_') and self.api_names:
+                classname = 'CHRAPI'
         raise AttributeError(f"'{classname}' object has no attribute '{attr}'")
 
+    @staticmethod
+    def get_messages_path(version):
+        name = re.sub(r'[^\w.-]+', '_', version)
+        return osp.join(CACHE_DIR, f'messages-{name}.json')
+
+    def load_messages(self):
+        '''
+        读取全部RetureCode的说明.
+
+        Called by api_initialize once the API is initialized. The table is
+        cached on disk per ChrApi version, so only the first start with a
+        version fetches it, in one bridge call. Only a complete table is
+        cached.
+        '''
+        import json
+        codes = tuple(int(x) for x in RetureCode)
+        rc, version = self.CHR_api_get_version()
+        path = None
+        if rc == RetureCode.CHR_OK:
+            path = self.get_messages_path(version)
+            try:
+                with open(path, encoding='utf-8') as f:
+                    messages = {int(k): v for k, v in json.load(f).items()}
+                if all(x in messages for x in codes):
+                    self.messages = messages
+                    return
+            except (OSError, ValueError):
+                pass
+        self.messages = dict(self.bridge.return_messages(self.api, codes))
+        if path is None or len(self.messages) != len(codes):
+            return
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(self.messages, f)
+        except OSError as ex:
+            self.logger.warning("Unable to write message cache: %s", ex)
+
+    def get_return_msg(self, code):
+        '''返回(rc, 说明), 优先使用预先读取的表'''
+        msg = self.messages.get(code)
+        if msg is not None:
+            return RetureCode.CHR_OK, msg
+        rc, msg = self.CHR_api_get_return_msg(code)
+        if rc == RetureCode.CHR_OK:
+            self.messages[int(code)] = msg
+        return rc, msg
+
     def show_error(self, handle, code, where):
         '''转换错误信息'''
-        rc, msg = self.CHR_api_get_return_msg(code)
+        rc, msg = self.get_return_msg(code)
         if rc != RetureCode.CHR_OK:
             # Could not get the message: show why
             self.logger.error("%s failed\n", where)
@@ -211,10 +576,34 @@ class Chariot:
                       RetureCode.CHR_APP_GROUP_INVALID)
 
         if (code in code_tuple) and handle != CHR_NULL_HANDLE:
-            rc, error_info = self.CHR_common_error_get_info(
-                handle, CHR_DETAIL_LEVEL.CHR_DETAIL_LEVEL_ALL)
-            if rc == RetureCode.CHR_OK:
-                self.logger.error("Extended error info:\n%s\n", error_info)
+            # fetched only if the record is formatted by a handler
+            self.logger.error("Extended error info:\n%s\n",
+                              ErrorInfo(self, handle))
+
+    def fetch(self, name, *args, compress=False, as_numpy=False):
+        '''以打包方式获取CHR函数的输出, 避免远程列表对象'''
+        rc, blob = self.bridge.call_packed(self.api, name, *args,
+                                           compress=compress)
+        if rc != RetureCode.CHR_OK:
+            api_name = name[4:]
+            if not api_name.startswith('api'):
+                handle = args[0] if args else CHR_NULL_HANDLE
+                self.show_error(handle, rc, api_name)
+            return None
+        from .serialize import unpack
+        return unpack(blob, as_numpy)
+
+    def gather(self, name, args, compress=False, as_numpy=False):
+        '''
+        在桥接端对每组参数调用同一个CHR函数, 一次返回所有结果.
+
+        Returns the return codes and the values, decoded from one packed
+        blob each.
+        '''
+        from .serialize import unpack
+        codes, values = self.bridge.gather(self.api, name, tuple(args),
+                                           compress)
+        return unpack(codes, as_numpy), unpack(values, as_numpy)
 
     def api_initialize(self):
         '''初始化IxChariot API'''
@@ -223,6 +612,8 @@ class Chariot:
         if rc != RetureCode.CHR_OK:
             self.logger.error("Initialization failed: rc = %d\n", rc)
             self.logger.error("Extended error info:\n%s\n", error_info)
+        else:
+            self.load_messages()
         return rc
 
     def set_pair_addr(self, pair, addr_e1, addr_e2):
@@ -244,17 +635,46 @@ class Chariot:
             script_path = script
         else:
             script_path = osp.join(self.path, 'Scripts', script)
-        if not osp.exists(script_path):
-            raise FileNotFoundError(f'Script is not fount:{script_path}')
+        if script_path not in self.scripts:
+            if not osp.exists(script_path):
+                raise FileNotFoundError(f'Script is not fount:{script_path}')
+            self.scripts.add(script_path)
         self.pair_use_script_filename(pair, script_path)
         if comment is not None:
             self.pair_set_comment(pair, comment)
         if protocol is not None:
             self.pair_set_protocol(pair, protocol)
 
-    def get_pairs(self, test_handle):
-        count = self.test_get_pair_count(test_handle)
-        return tuple(self.test_get_pair(test_handle, x) for x in range(count))
+    def get_pairs(self, test_handle, chunk_size=256):
+        '''返回test中全部pair句柄的元组, 每块在桥接端一次获取'''
+        return tuple(self.pairs_view(test_handle, chunk_size))
+
+    def pairs_view(self, test_handle, chunk_size=256):
+        '''按块延迟获取test中的pair句柄, 每块在桥接端一次完成'''
+        from .common import ChunkedSequence
+
+        def fetch(start, stop):
+            codes, handles = self.gather(
+                'CHR_test_get_pair',
+                ((test_handle, x) for x in range(start, stop)))
+            for rc in codes:
+                if rc != RetureCode.CHR_OK:
+                    self.show_error(test_handle, rc, 'test_get_pair')
+                    break
+            return list(handles)
+        return ChunkedSequence(lambda: self.test_get_pair_count(test_handle),
+                               fetch, chunk_size)
+
+    def get_pairs_runstatus(self, pairs, as_numpy=False):
+        '''批量获取pair运行状态, 返回CHR_PAIR_RUNSTATUS_TYPE列表或数组'''
+        from .common import decode_array
+        codes, values = self.gather('CHR_pair_get_runStatus', pairs,
+                                    as_numpy=as_numpy)
+        for pair, rc in zip(pairs, codes):
+            if rc != RetureCode.CHR_OK:
+                self.show_error(pair, rc, 'pair_get_runStatus')
+                break
+        return decode_array(CHR_PAIR_RUNSTATUS_TYPE, values)
 
     def get_pair_time_elapsed(self, pair):
         '''获取pair占用时间'''
@@ -276,57 +696,83 @@ class Chariot:
         recv = self.common_results_get_bytes_recv_e1(handle)
         return sent + recv
 
+    def get_pairs_stats(self, pairs, groups=None):
+        '''
+        在桥接端一次遍历计算pairs的汇总结果.
+
+        Returns a PairsStats, or a dict of key to PairsStats when *groups*
+        gives a key for each pair.
+        '''
+        pairs = tuple(pairs)
+        if groups is not None:
+            groups = tuple(groups)
+        result = self.bridge.pairs_stats(self.api, pairs, groups)
+        if groups is None:
+            stats = PairsStats(*result)
+            if stats.errors:
+                self.logger.warning("Failed to get results of %d pairs",
+                                    stats.errors)
+            return stats
+        return {key: PairsStats(*value) for key, value in result}
+
+    def sum_pairs_values(self, name, pairs):
+        '''在桥接端对每个pair调用name, 返回成功值的和'''
+        pairs = tuple(pairs)
+        codes, values = self.gather(f'CHR_{name}', pairs)
+        total = 0
+        for pair, rc, value in zip(pairs, codes, values):
+            if rc != RetureCode.CHR_OK:
+                self.show_error(pair, rc, name)
+            else:
+                total += value
+        return total
+
     def get_pairs_bytes_sent_e1(self, pairs):
         '''获取pair传输总发送bytes数'''
-        return sum(self.common_results_get_bytes_sent_e1(x) for x in pairs)
+        return self.sum_pairs_values('common_results_get_bytes_sent_e1',
+                                     pairs)
 
     def get_pairs_bytes_recv_e1(self, pairs):
         '''获取pair传输总接收bytes数'''
-        return sum(self.common_results_get_bytes_recv_e1(x) for x in pairs)
+        return self.sum_pairs_values('common_results_get_bytes_recv_e1',
+                                     pairs)
 
     def get_pairs_results_average(self, pairs):
         '''获取pairs序列的总透传平均速率'''
-        elapsed_max = max(self.get_pair_time_elapsed(x) for x in pairs)
-        if elapsed_max == 0:
-            return None
-        trans_sum = sum(self.get_pair_bytes_all_e1(x) for x in pairs)
-        trans_mbps = trans_sum * 8e-6
-        average = trans_mbps / elapsed_max
-        return average
+        return self.get_pairs_stats(pairs).average()
 
     def get_pairs_measure_results_average(self, pairs):
         '''获取pairs序列的总透传平均速率'''
-        measure_time_max = max(self.get_pair_measure_time(x) for x in pairs)
-        if measure_time_max == 0:
-            return None
-        trans_sum = sum(self.get_pair_bytes_all_e1(x) for x in pairs)
-        trans_mbps = trans_sum * 8e-6
-        average = trans_mbps / measure_time_max
-        return average
-
-    def pair_swap_endpoints(self, pair):
-        '''获取pairs序列的总透传平均速率'''
-        if self.api.has_func('CHR_pair_swap_endpoints'):
-            chr_api_wrapper(
-                self, getattr(self, 'CHR_pair_swap_endpoints'))(pair)
-        else:
-            e1 = self.pair_get_e1_addr(pair)
-            e2 = self.pair_get_e2_addr(pair)
-            self.set_pair_addr(pair, e2, e1)
+        return self.get_pairs_stats(pairs).average(measure=True)
 
     def get_swap_pairs_test(self, test):
-        '''获取pairs序列的总透传平均速率'''
-        test_handle = self.test_new()
-        src_pairs = self.get_pairs(test)
-        dst_pairs = []
-        for src_pair in src_pairs:
-            dst_pair = self.pair_new()
-            self.pair_copy(dst_pair, src_pair)
-            self.pair_swap_endpoints(dst_pair)
-            dst_pairs.append(dst_pair)
-            self.test_add_pair(test_handle, dst_pair)
+        '''复制test中的pairs并交换端点, 返回新test句柄, 失败时返回None'''
+        return self.clone_test(test, swap=True, groups=False)
+
+    def clone_test(self, test, addresses=None, swap=False, groups=True):
+        '''
+        在桥接端一次复制test的选项, pairs, mgroups和app groups到新test.
+
+        *addresses* gives (e1, e2) per pair to override the endpoint
+        addresses, None keeps the copied address. Returns None if a call
+        failed, the partial test is deleted by the bridge.
+        '''
+        if addresses is not None:
+            addresses = tuple(tuple(x) for x in addresses)
+        rc, test_handle, where = self.bridge.clone_test(
+            self.api, test, addresses, swap, groups)
+        if rc != RetureCode.CHR_OK:
+            self.show_error(test, rc, where[4:])
+            return None
         return test_handle
 
+    def register_template(self, name, test):
+        '''登记已配置好的test作为模板'''
+        self.templates[name] = test
+
+    def clone_template(self, name, addresses=None):
+        return self.clone_test(self.templates[name], addresses)
+
     def wait_for_test(self, test_handle, time_callback=None, timeout=1):
         is_finished = False
         timer = 0
@@ -369,3 +815,15 @@ class Chariot:
                             "wait_for_test")
             return False
         return True
+
+    def wait_for_tests(self, test_handles, timeout=None, expected=None):
+        '''同时等待多个测试结束, 返回每个测试是否正常结束'''
+        futures = [self.waiter.watch_test(x, expected, timeout)
+                   for x in test_handles]
+        return [x.result() for x in futures]
+
+    def wait_for_tracerts(self, tracert_handles, timeout=None):
+        '''同时等待多个traceroute pair结束'''
+        futures = [self.waiter.watch_tracert(x, timeout=timeout)
+                   for x in tracert_handles]
+        return [x.result() for x in futures]
@@ -6,6 +6,10 @@ Created on Thu Apr 15 17:34:40 2021
 """
 from enum import IntEnum
 
+# pychariot32 package version: the CHR API version and a revision which is
+# increased whenever the bridge side code changes
+BRIDGE_VERSION = (7, 10, 4, 1)
+
 # Definition of a unique signature, characterizing an ASD of type VoIP.
 # Used when instantiating ASD objects.
 
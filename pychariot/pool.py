@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 19:02:44 2026
+
+@author: 皓
+"""
+# pylint: disable=import-outside-toplevel
+import os
+import sys
+import time
+import queue
+import socket
+import logging
+import subprocess
+from platform import architecture
+from concurrent.futures import ThreadPoolExecutor
+from .chariot import Chariot
+
+
+def get_free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_port(port, timeout):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with socket.create_connection(('127.0.0.1', port), 1):
+                return True
+        except OSError:
+            if time.monotonic() > deadline:
+                return False
+            time.sleep(0.1)
+
+
+def get_bridge_python():
+    '''返回运行桥接服务的Python解释器及包名'''
+    arch, ost = architecture()
+    if ost == 'WindowsPE' and arch == '64bit':
+        from rpcpy32.server import PYTHON
+        return PYTHON, 'pychariot32'
+    return sys.executable, 'pychariot'
+
+
+def default_initializer(chariot):
+    chariot.api_initialize()
+
+
+class BridgeWorker:
+    '''一个独立的桥接进程, 拥有自己的ChrApi.dll实例'''
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, index, python, package, initializer=None,
+                 transport='tcp', startup_timeout=30):
+        self.logger = logging.getLogger()
+        self.index = index
+        self.python = python
+        self.package = package
+        self.initializer = initializer
+        self.transport = transport
+        self.startup_timeout = startup_timeout
+        self.port = None
+        self.process = None
+        self.chariot = None
+
+    def __repr__(self):
+        return f"<{self.__class__.__name__} {self.index} [port {self.port}]>"
+
+    def start(self):
+        self.port = get_free_port()
+        cmd = [self.python, '-m', f'{self.package}.bridge',
+               '--port', str(self.port)]
+        self.process = subprocess.Popen(cmd)  # pylint: disable=consider-using-with
+        if not wait_port(self.port, self.startup_timeout):
+            self.stop()
+            raise TimeoutError(f'Bridge worker {self.index} did not start')
+        # connect to this worker's own process, never through start_rpc,
+        # which would probe or restart the shared rpcpy32 server
+        self.chariot = Chariot(transport=self.transport, port=self.port,
+                               keep_server=True)
+        self.chariot.connect_bridge('localhost', self.package)
+        if self.initializer is not None:
+            self.initializer(self.chariot)
+
+    def alive(self, timeout=5):
+        if self.process is None or self.process.poll() is not None:
+            return False
+        try:
+            self.chariot.rpc.ping(timeout=timeout)
+        except Exception:  # pylint: disable=broad-except
+            return False
+        return True
+
+    def stop(self):
+        chariot, self.chariot = self.chariot, None
+        if chariot is not None:
+            try:
+                chariot.stop_rpc(stop_server=False)
+            except Exception:  # pylint: disable=broad-except
+                pass
+        process, self.process = self.process, None
+        if process is not None and process.poll() is None:
+            process.terminate()
+            try:
+                process.wait(5)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    def restart(self):
+        self.logger.warning("Restart bridge worker %d", self.index)
+        self.stop()
+        self.start()
+
+
+class BridgePool:
+    '''
+    桥接进程池, 将互不共享状态的任务分发到多个桥接进程并行执行.
+
+    Jobs are callables taking a connected Chariot as first argument; all
+    handles a job creates belong to the worker it runs on.
+    '''
+
+    # pylint: disable=too-many-arguments
+    def __init__(self, size=None, python=None, initializer=default_initializer,
+                 transport='tcp', startup_timeout=30):
+        self.logger = logging.getLogger()
+        self.size = size if size else os.cpu_count() or 1
+        bridge_python, package = get_bridge_python()
+        self.python = python if python else bridge_python
+        self.workers = [BridgeWorker(x, self.python, package, initializer,
+                                     transport, startup_timeout)
+                        for x in range(self.size)]
+        self.idle = queue.Queue()
+        self.executor = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def start(self):
+        if self.executor is not None:
+            return
+        with ThreadPoolExecutor(self.size) as executor:
+            list(executor.map(lambda x: x.start(), self.workers))
+        for worker in self.workers:
+            self.idle.put(worker)
+        self.executor = ThreadPoolExecutor(self.size)
+
+    def run(self, func, args, kwargs):
+        worker = self.idle.get()
+        try:
+            if not worker.alive():
+                worker.restart()
+            return func(worker.chariot, *args, **kwargs)
+        except (EOFError, ConnectionError):
+            # the worker crashed while running the job
+            if not worker.alive():
+                worker.restart()
+            raise
+        finally:
+            self.idle.put(worker)
+
+    def submit(self, func, *args, **kwargs):
+        if self.executor is None:
+            self.start()
+        return self.executor.submit(self.run, func, args, kwargs)
+
+    def map(self, func, *iterables):
+        futures = [self.submit(func, *args) for args in zip(*iterables)]
+        return [x.result() for x in futures]
+
+    def check(self):
+        '''健康检查, 重启已退出的空闲进程'''
+        workers = []
+        while True:
+            try:
+                workers.append(self.idle.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            for worker in workers:
+                if not worker.alive():
+                    worker.restart()
+        finally:
+            for worker in workers:
+                self.idle.put(worker)
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        for worker in self.workers:
+            worker.stop()
+        self.idle = queue.Queue()
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 14:05:52 2026
+
+@author: 皓
+"""
+# pylint: disable=import-outside-toplevel
+import io
+import sys
+import zlib
+import struct
+from array import array
+
+
+MAGIC = b'PCR1'
+# magic, kind, typecode, flags, padding to keep the payload aligned
+HEADER = struct.Struct('<4sccBx')
+KIND_ARRAY = b'a'
+KIND_NUMPY = b'n'
+KIND_STRING = b's'
+FLAG_ZLIB = 0x01
+
+
+def infer_typecode(values):
+    if all(isinstance(x, int) for x in values):
+        if not values or min(values) >= -(1 << 63) and max(values) < 1 << 63:
+            return 'q'
+        return 'Q'
+    return 'd'
+
+
+def get_numpy():
+    '''按需导入numpy, 未安装时返回None'''
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+
+def pack(values, typecode=None, compress=False):
+    '''
+    Pack a sequence of numbers or strings into one bytes blob.
+
+    numpy arrays are stored as .npy data, str sequences as NUL separated
+    utf-8 text and everything else as an array.array of *typecode*.
+    '''
+    # an ndarray implies numpy is imported already
+    np = sys.modules.get('numpy')
+    if np is not None and isinstance(values, np.ndarray):
+        kind, typecode = KIND_NUMPY, ' '
+        buffer = io.BytesIO()
+        np.save(buffer, values, allow_pickle=False)
+        payload = buffer.getvalue()
+    elif values and all(isinstance(x, str) for x in values):
+        kind, typecode = KIND_STRING, ' '
+        payload = '\0'.join(values).encode('utf-8')
+    else:
+        values = list(values)
+        kind = KIND_ARRAY
+        if typecode is None:
+            typecode = infer_typecode(values)
+        payload = array(typecode, values).tobytes()
+    flags = 0
+    if compress:
+        payload = zlib.compress(payload)
+        flags |= FLAG_ZLIB
+    header = HEADER.pack(MAGIC, kind, typecode.encode('ascii'), flags)
+    return header + payload
+
+
+def _load_npy(np, payload):
+    # parse the .npy header and map the data without copying
+    stream = io.BytesIO(payload)
+    version = np.lib.format.read_magic(stream)
+    if version == (1, 0):
+        header = np.lib.format.read_array_header_1_0(stream)
+    else:
+        header = np.lib.format.read_array_header_2_0(stream)
+    shape, fortran_order, dtype = header
+    data = np.frombuffer(payload, dtype=dtype, offset=stream.tell())
+    order = 'F' if fortran_order else 'C'
+    return data.reshape(shape, order=order)
+
+
+def unpack(blob, as_numpy=False):
+    '''
+    Decode a blob created by pack.
+
+    Numbers are returned as a memoryview over the blob (or a numpy array if
+    *as_numpy* is True), strings as a tuple.
+    '''
+    view = memoryview(blob)
+    magic, kind, typecode, flags = HEADER.unpack_from(view)
+    if magic != MAGIC:
+        raise ValueError('Invalid packed data')
+    payload = view[HEADER.size:]
+    if flags & FLAG_ZLIB:
+        payload = memoryview(zlib.decompress(payload))
+    if kind == KIND_STRING:
+        return tuple(bytes(payload).decode('utf-8').split('\0'))
+    np = get_numpy() if as_numpy or kind == KIND_NUMPY else None
+    if kind == KIND_NUMPY:
+        if np is None:
+            raise ImportError('numpy is required to unpack npy data')
+        return _load_npy(np, payload)
+    typecode = typecode.decode('ascii')
+    if np is not None:
+        return np.frombuffer(payload, dtype=typecode)
+    return payload.cast(typecode)
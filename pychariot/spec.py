@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 23:05:41 2026
+
+@author: 皓
+
+Declarative test specs.
+
+A spec is a dict (or JSON/YAML text or file) such as::
+
+    {
+        "runopts": {"test_duration": 60, "test_end": 1},
+        "dgopts": {"retrans_count": 3},
+        "pairs": [
+            {"e1_addr": "10.0.0.1", "e2_addr": "10.0.0.2",
+             "script": "C:/Ixia/Scripts/Throughput.scr", "protocol": 1,
+             "script_variables": {"file_size": "100000"}}
+        ],
+        "mgroups": [
+            {"name": "group", "e1_addr": "10.0.0.1",
+             "multicast_addr": "225.0.0.1", "multicast_port": 5000,
+             "script": "C:/Ixia/Scripts/Multimedia.scr",
+             "mpairs": [{"e2_addr": "10.0.0.3"}]}
+        ]
+    }
+
+compile_spec() checks it and TestSpec.operations() lists the wrapper calls
+which build it, or only the changed setters for an existing test.
+"""
+import json
+import os.path as osp
+from enum import Enum
+from collections import namedtuple
+from .common import CommitError
+from .const import CHR_PROTOCOL
+from .wrapper import (BaseCHR, Test, Pair, MGroup, MPair, RunOptions,
+                      DatagramOptions, parse_protocol)
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+
+# option sections and the class of their object
+OPTIONS = {'runopts': RunOptions, 'dgopts': DatagramOptions}
+# spec keys which are calls instead of properties
+SCRIPT = 'script'
+SCRIPT_VARIABLES = 'script_variables'
+MPAIRS = 'mpairs'
+# properties of pairs declared without their enum
+PROTOCOL_FIELDS = frozenset(('protocol', 'console_e1_protocol'))
+
+
+class Operation(namedtuple('Operation', ('target', 'index', 'name', 'value'))):
+    '''
+    One wrapper call.
+
+    *target* is 'runopts', 'dgopts', 'pair', 'mgroup' or 'mpair', *index*
+    the position of the pair or mgroup ((mgroup, mpair) for mpairs). *name*
+    is a property name, or one of 'new', 'add', 'use_script_filename' and
+    'set_script_variable'.
+    '''
+    __slots__ = ()
+
+
+def load_spec(source):
+    '''读取dict, JSON/YAML文本或文件形式的spec'''
+    if isinstance(source, dict):
+        return source
+    text = source
+    is_yaml = False
+    if osp.isfile(source):
+        is_yaml = osp.splitext(source)[1].lower() in ('.yaml', '.yml')
+        with open(source, encoding='utf-8') as file:
+            text = file.read()
+    if not is_yaml:
+        try:
+            return json.loads(text)
+        except ValueError:
+            pass
+    if yaml is None:
+        raise ImportError('PyYAML is required to load YAML specs')
+    return yaml.safe_load(text)
+
+
+def coerce(cls, name, value):
+    '''检查属性名, 将枚举名转换为枚举值'''
+    fields = cls.config_fields()
+    if name not in fields:
+        raise ValueError(f'Unknown {cls.__name__} property: {name}')
+    datatype = getattr(cls, name).datatype
+    if datatype is None and name in PROTOCOL_FIELDS:
+        return CHR_PROTOCOL(parse_protocol(value))
+    if isinstance(datatype, type) and issubclass(datatype, Enum):
+        return datatype[value] if isinstance(value, str) else datatype(value)
+    return value
+
+
+def same_path(path, other):
+    '''两个脚本路径是否指向同一文件'''
+    if not path or not other:
+        return path == other
+    return (osp.normcase(osp.normpath(path))
+            == osp.normcase(osp.normpath(other)))
+
+
+def compile_object(cls, spec, extra=()):
+    '''返回(属性, 脚本, 脚本变量), 未知键引发ValueError'''
+    spec = dict(spec)
+    script = spec.pop(SCRIPT, None)
+    variables = dict(spec.pop(SCRIPT_VARIABLES, None) or {})
+    for key in extra:
+        spec.pop(key, None)
+    values = {name: coerce(cls, name, value) for name, value in spec.items()}
+    return values, script, variables
+
+
+class TestSpec:
+    '''编译后的spec'''
+
+    def __init__(self, spec):
+        spec = load_spec(spec)
+        unknown = set(spec) - set(OPTIONS) - {'pairs', 'mgroups'}
+        if unknown:
+            raise ValueError(f'Unknown spec section: {", ".join(unknown)}')
+        self.options = {
+            section: {name: coerce(cls, name, value)
+                      for name, value in (spec.get(section) or {}).items()}
+            for section, cls in OPTIONS.items()}
+        self.pairs = [compile_object(Pair, x)
+                      for x in spec.get('pairs') or ()]
+        self.mgroups = [
+            (compile_object(MGroup, x, (MPAIRS,)),
+             [compile_object(MPair, y)[0] for y in x.get(MPAIRS) or ()])
+            for x in spec.get('mgroups') or ()]
+
+    def build_operations(self, target, index, compiled):
+        values, script, variables = compiled
+        ops = [Operation(target, index, 'new', None)]
+        ops.extend(Operation(target, index, name, value)
+                   for name, value in values.items())
+        if script is not None:
+            ops.append(Operation(target, index, 'use_script_filename', script))
+        ops.extend(Operation(target, index, 'set_script_variable', item)
+                   for item in variables.items())
+        return ops
+
+    @staticmethod
+    def matches(obj, compiled):
+        '''pair, mgroup或mpair是否与spec一致'''
+        values, script, variables = compiled
+        current = dict(obj.api.call(obj.read_fields, tuple(values)))
+        if any(current.get(name) != value for name, value in values.items()):
+            return False
+        if script is not None and not same_path(obj.script_filename, script):
+            return False
+        return all(obj.get_script_variable(name) == value
+                   for name, value in variables.items())
+
+    def mgroup_matches(self, mgroup, compiled, mpairs):
+        if not self.matches(mgroup, compiled):
+            return False
+        members = mgroup.mpairs
+        if len(members) != len(mpairs):
+            return False
+        return all(self.matches(x, (values, None, {}))
+                   for x, values in zip(members, mpairs))
+
+    def operations(self, test=None):
+        '''
+        Return the Operations building the spec.
+
+        For an existing *test* only changed options are set, diffed against
+        one read of the options in the spec, and missing pairs and mgroups
+        added. Pairs and mgroups owned by a test can not
+        be changed, ValueError is raised if they (or the mpairs of a
+        mgroup) differ from the spec.
+        '''
+        ops = []
+        for section, values in self.options.items():
+            if test is not None and values:
+                obj = getattr(test, section)
+                current = dict(obj.api.call(obj.read_fields, tuple(values)))
+                values = {name: value for name, value in values.items()
+                          if current.get(name) != value}
+            ops.extend(Operation(section, None, name, value)
+                       for name, value in values.items())
+        pairs = test.pairs if test is not None else ()
+        if len(pairs) > len(self.pairs):
+            raise ValueError(f'The test has {len(pairs)} pairs, the spec '
+                             f'{len(self.pairs)}')
+        for index, compiled in enumerate(self.pairs):
+            if index < len(pairs):
+                if not self.matches(pairs[index], compiled):
+                    raise ValueError(f'Pair {index} of the test differs '
+                                     'from the spec')
+                continue
+            ops.extend(self.build_operations('pair', index, compiled))
+            ops.append(Operation('pair', index, 'add', None))
+        mgroups = test.mgroups if test is not None else ()
+        if len(mgroups) > len(self.mgroups):
+            raise ValueError(f'The test has {len(mgroups)} mgroups, the spec '
+                             f'{len(self.mgroups)}')
+        for index, (compiled, mpairs) in enumerate(self.mgroups):
+            if index < len(mgroups):
+                if not self.mgroup_matches(mgroups[index], compiled, mpairs):
+                    raise ValueError(f'MGroup {index} of the test differs '
+                                     'from the spec')
+                continue
+            ops.extend(self.build_operations('mgroup', index, compiled))
+            for number, values in enumerate(mpairs):
+                ops.extend(self.build_operations(
+                    'mpair', (index, number), (values, None, {})))
+                ops.append(Operation('mpair', (index, number), 'add', None))
+            ops.append(Operation('mgroup', index, 'add', None))
+        return ops
+
+    def apply(self, test=None, clear_results=False):
+        '''
+        在一次批量调用中构建spec或将其差异应用到已有test.
+
+        Option writes are flushed after the pairs and mgroups without being
+        read again, failures raise CommitError. Returns the test.
+        '''
+        return BaseCHR.api.call(self.execute, test, clear_results)
+
+    def execute(self, test, clear_results):
+        ops = self.operations(test)
+        if test is None:
+            test = Test()
+        elif ops and clear_results:
+            test.clear_results()
+        # the operations hold only changed options, flush them unchecked
+        options = {x: [] for x in OPTIONS}
+        objects = {}
+        for op in ops:
+            if op.target in options:
+                options[op.target].append((op.name, op.value))
+            else:
+                self.run(test, objects, op)
+        errors = {}
+        for section, items in options.items():
+            if items:
+                obj = getattr(test, section)
+                failed = obj.flush_fields(tuple(items), compare=False)
+                if failed:
+                    errors[obj] = failed
+        if errors:
+            raise CommitError(errors)
+        return test
+
+    @staticmethod
+    def run(test, objects, op):
+        target, index, name, value = op
+        key = (target, index)
+        if name == 'new':
+            objects[key] = {'pair': Pair, 'mgroup': MGroup,
+                            'mpair': MPair}[target]()
+            return
+        obj = objects[key]
+        if name == 'add':
+            if target == 'mpair':
+                objects[('mgroup', index[0])].add_mpair(obj)
+            else:
+                getattr(test, f'add_{target}')(obj)
+            # owned by its container now, the wrapper must not delete it
+            obj.release_handle()
+        elif name == 'use_script_filename':
+            obj.use_script_filename(value)
+        elif name == 'set_script_variable':
+            obj.set_script_variable(*value)
+        else:
+            setattr(obj, name, value)
+
+
+def compile_spec(source):
+    return TestSpec(source)
+
+
+def apply_spec(source, test=None, clear_results=False):
+    '''编译spec并应用到test, test为None时新建'''
+    return compile_spec(source).apply(test, clear_results)
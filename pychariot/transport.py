@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 09:40:18 2026
+
+@author: 皓
+"""
+# pylint: disable=import-outside-toplevel
+import sys
+import os.path as osp
+
+
+DEFAULT_PORT = 18812
+LOCAL_ADDRESSES = ('localhost', '127.0.0.1')
+
+
+class Transport:
+    '''桥接服务的连接方式'''
+    NAME = None
+    LOCAL = False
+
+    @classmethod
+    def available(cls):
+        return True
+
+    def connect(self, address):
+        raise NotImplementedError
+
+    def serve(self, conn, package):
+        '''通过已有连接让桥接服务在本传输方式上监听'''
+
+
+class TCPTransport(Transport):
+    NAME = 'tcp'
+
+    def __init__(self, port=DEFAULT_PORT):
+        self.port = port
+
+    def connect(self, address):
+        import rpyc
+        return rpyc.classic.connect(address, self.port)
+
+
+class UnixTransport(Transport):
+    NAME = 'unix'
+    LOCAL = True
+
+    def __init__(self, path=None, port=DEFAULT_PORT):
+        if path is None:
+            import tempfile
+            path = osp.join(tempfile.gettempdir(),
+                            f'pychariot-bridge-{port}.sock')
+        self.path = path
+
+    @classmethod
+    def available(cls):
+        import socket
+        return hasattr(socket, 'AF_UNIX')
+
+    def connect(self, address):
+        import rpyc
+        return rpyc.classic.unix_connect(self.path)
+
+    def serve(self, conn, package):
+        conn.modules[f'{package}.bridge'].serve_unix(self.path)
+
+
+class PipeTransport(Transport):
+    NAME = 'pipe'
+    LOCAL = True
+
+    def __init__(self, name=None, port=DEFAULT_PORT):
+        self.name = name if name is not None else f'pychariot-{port}'
+
+    @classmethod
+    def available(cls):
+        if sys.platform != 'win32':
+            return False
+        try:
+            import win32file  # noqa: F401 pylint: disable=unused-import
+        except ImportError:
+            return False
+        return True
+
+    def connect(self, address):
+        import rpyc
+        from rpyc.core.stream import NamedPipeStream
+        try:
+            stream = NamedPipeStream.create_client(self.name)
+        except Exception as ex:  # pylint: disable=broad-except
+            raise ConnectionError(f'Unable to open pipe {self.name}') from ex
+        return rpyc.classic.connect_stream(stream)
+
+    def serve(self, conn, package):
+        conn.modules[f'{package}.bridge'].serve_pipe(self.name)
+
+
+TRANSPORTS = {x.NAME: x for x in (TCPTransport, UnixTransport, PipeTransport)}
+
+
+def get_transport(transport=None, port=DEFAULT_PORT):
+    '''
+    Return a Transport instance.
+
+    *transport* may be a Transport, one of 'tcp', 'unix', 'pipe', or 'auto'
+    which prefers a named pipe on Windows, then an Unix domain socket, then
+    TCP.
+    '''
+    if isinstance(transport, Transport):
+        return transport
+    if transport in (None, TCPTransport.NAME):
+        return TCPTransport(port)
+    if transport == 'auto':
+        for cls in (PipeTransport, UnixTransport):
+            if cls.available():
+                return cls(port=port)
+        return TCPTransport(port)
+    if transport not in TRANSPORTS:
+        raise ValueError(f'Unsupport transport:{transport}')
+    cls = TRANSPORTS[transport]
+    if not cls.available():
+        raise OSError(f'Transport {transport} is not available')
+    return cls(port=port)
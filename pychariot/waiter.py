@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 16:31:08 2026
+
+@author: 皓
+"""
+import time
+import heapq
+import weakref
+import itertools
+import logging
+import threading
+from concurrent.futures import Future
+from .const import RetureCode
+
+
+class Watch:
+    def __init__(self, name, query, handle, expected=None, timeout=None):
+        self.name = name
+        self.query = query
+        self.handle = handle
+        self.start = time.monotonic()
+        self.expected = expected
+        self.deadline = None if timeout is None else self.start + timeout
+        self.next_due = self.start
+        self.future = Future()
+
+    def next_interval(self, now, min_interval, max_interval):
+        '''根据预计剩余时间调整轮询间隔'''
+        elapsed = now - self.start
+        if self.expected is None:
+            interval = elapsed / 10
+        else:
+            remaining = self.expected - elapsed
+            interval = remaining / 2 if remaining > 0 else -remaining / 4
+        if self.deadline is not None:
+            interval = min(interval, self.deadline - now)
+        return max(min_interval, min(interval, max_interval))
+
+
+class Waiter:
+    '''
+    在一个后台线程中同时等待多个测试和traceroute结束.
+
+    Each watch returns a Future which resolves to True when the object
+    stopped, or False on timeout or error. Watches are kept in a heap by
+    their next poll time and only the due ones are polled.
+    '''
+
+    def __init__(self, chariot, min_interval=0.1, max_interval=5.0):
+        self.logger = logging.getLogger()
+        # weak, the waiter must not keep its Chariot alive
+        self.chariot = weakref.proxy(chariot)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.watches = set()
+        # (next_due, sequence, watch), entries of removed watches are skipped
+        self.queue = []
+        self.sequence = itertools.count()
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def watch_test(self, handle, expected=None, timeout=None, callback=None):
+        return self.watch('test_query_stop', self.chariot.CHR_test_query_stop,
+                          handle, expected, timeout, callback)
+
+    def watch_tracert(self, handle, expected=None, timeout=None,
+                      callback=None):
+        return self.watch('tracert_pair_query_stop',
+                          self.chariot.CHR_tracert_pair_query_stop,
+                          handle, expected, timeout, callback)
+
+    # pylint: disable=too-many-arguments
+    def watch(self, name, query, handle, expected=None, timeout=None,
+              callback=None):
+        watch = Watch(name, query, handle, expected, timeout)
+        if callback is not None:
+            watch.future.add_done_callback(callback)
+        with self.lock:
+            self.watches.add(watch)
+            self.schedule(watch)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, daemon=True)
+                self.thread.start()
+        self.wakeup.set()
+        return watch.future
+
+    def cancel(self, handle):
+        with self.lock:
+            watches = [x for x in self.watches if x.handle == handle]
+            self.watches.difference_update(watches)
+        for watch in watches:
+            watch.future.cancel()
+
+    def cancel_all(self):
+        with self.lock:
+            watches = list(self.watches)
+            self.watches.clear()
+            self.queue.clear()
+        for watch in watches:
+            watch.future.cancel()
+
+    def schedule(self, watch):
+        heapq.heappush(self.queue,
+                       (watch.next_due, next(self.sequence), watch))
+
+    def pop_due(self, now):
+        '''取出到期的watch, 返回(watches, 到下一个watch的等待时间)'''
+        due = []
+        queue = self.queue
+        while queue and (queue[0][0] <= now
+                         or queue[0][2] not in self.watches):
+            watch = heapq.heappop(queue)[2]
+            if watch in self.watches:
+                due.append(watch)
+        return due, (queue[0][0] - now if queue else None)
+
+    def finish(self, watch, result):
+        with self.lock:
+            self.watches.discard(watch)
+        if not watch.future.done():
+            watch.future.set_result(result)
+
+    def show_error(self, handle, code, where):
+        try:
+            self.chariot.show_error(handle, code, where)
+        except ReferenceError:
+            self.logger.error("%s failed: rc = %d", where, code)
+
+    def poll(self, watch, now):
+        try:
+            rc = watch.query(watch.handle, 0)
+        except Exception as ex:  # pylint: disable=broad-except
+            with self.lock:
+                self.watches.discard(watch)
+            watch.future.set_exception(ex)
+            return False
+        if rc == RetureCode.CHR_OK:
+            self.finish(watch, True)
+            return False
+        if rc != RetureCode.CHR_TIMED_OUT:
+            self.show_error(watch.handle, rc, watch.name)
+            self.finish(watch, False)
+            return False
+        if watch.deadline is not None and now >= watch.deadline:
+            self.show_error(watch.handle, RetureCode.CHR_TIMED_OUT,
+                            watch.name)
+            self.finish(watch, False)
+            return False
+        return True
+
+    def run(self):
+        while True:
+            # cleared first, a watch added meanwhile sets it again
+            self.wakeup.clear()
+            with self.lock:
+                if not self.watches:
+                    self.queue.clear()
+                    self.thread = None
+                    return
+                due, delay = self.pop_due(time.monotonic())
+            for watch in due:
+                if watch.future.cancelled():
+                    with self.lock:
+                        self.watches.discard(watch)
+                    continue
+                now = time.monotonic()
+                if self.poll(watch, now):
+                    watch.next_due = now + watch.next_interval(
+                        now, self.min_interval, self.max_interval)
+                    with self.lock:
+                        if watch in self.watches:
+                            self.schedule(watch)
+            if not due:
+                self.wakeup.wait(self.max_interval if delay is None else delay)
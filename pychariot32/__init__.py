@@ -1,18 +1,50 @@
 # -*- coding: utf-8 -*-
+"""
+Names are resolved lazily, a bridge process only imports chrapi and
+wrapper when they are first used.
+"""
+from importlib import import_module
 
-from .chrapi import CHR_API_VERSION, CHRAPI
-from .const import (RetureCode, CHR_NULL_HANDLE, CHR_BOOLEAN,
-                    CHR_PROTOCOL, CHR_QOS_TEMPLATE_TYPE, CHR_VOIP_CODEC,
-                    CHR_VIDEO_CODEC, CHR_DETAIL_LEVEL, CHR_THROUGHPUT_UNITS,
-                    CHR_TEST_END, CHR_TEST_HOW_ENDED, CHR_TEST_REPORTING,
-                    CHR_TEST_REPORTING_FIREWALL, CHR_TEST_RETRIEVING,
-                    CHR_RESULTS, CHR_CFG_PARM,
-                    CHR_TRACERT_RUNSTATUS_TYPE, CHR_PAIR_RUNSTATUS_TYPE,
-                    CHR_MEASURE_STATS, CHR_PAIR_TYPE, CHR_LICENSE_TYPE,
-                    CHR_REPORT_ITEM, CHR_GROUPING_TYPE, CHR_SORT_ORDER)
-from .wrapper import (Api, CommonError, DatagramOptions, RunOptions,
-                      HopRecord, TimingRecord, PairTimingRecord, MPair,
-                      Pair, MGroup, TracertPair, VoipPair, VideoPair,
-                      VideoMGroup, HardwarePair, HardwareVoipPair, AppGroup,
-                      Channel, Report, Receiver, Test, VPair, VTest)
-__version__ = '.'.join([str(x) for x in CHR_API_VERSION])
+SUBMODULES = frozenset((
+    'bridge', 'chrapi', 'chrapi_defs', 'common', 'const', 'serialize',
+    'spec', 'utils', 'voip_defs', 'wrapper'))
+EXPORTS = dict.fromkeys(('CHR_API_VERSION', 'CHRAPI'), 'chrapi')
+EXPORTS.update(dict.fromkeys((
+    'RetureCode', 'CHR_NULL_HANDLE', 'CHR_BOOLEAN',
+    'CHR_PROTOCOL', 'CHR_QOS_TEMPLATE_TYPE', 'CHR_VOIP_CODEC',
+    'CHR_VIDEO_CODEC', 'CHR_DETAIL_LEVEL',
+    'CHR_THROUGHPUT_UNITS', 'CHR_TEST_END',
+    'CHR_TEST_HOW_ENDED', 'CHR_TEST_REPORTING',
+    'CHR_TEST_REPORTING_FIREWALL', 'CHR_TEST_RETRIEVING',
+    'CHR_RESULTS', 'CHR_CFG_PARM',
+    'CHR_TRACERT_RUNSTATUS_TYPE', 'CHR_PAIR_RUNSTATUS_TYPE',
+    'CHR_MEASURE_STATS', 'CHR_PAIR_TYPE', 'CHR_LICENSE_TYPE',
+    'CHR_REPORT_ITEM', 'CHR_GROUPING_TYPE', 'CHR_SORT_ORDER'),
+    'const'))
+EXPORTS.update(dict.fromkeys((
+    'Api', 'CommonError', 'DatagramOptions', 'RunOptions', 'HopRecord',
+    'TimingRecord', 'PairTimingRecord', 'MPair', 'Pair', 'MGroup',
+    'TracertPair', 'VoipPair', 'VideoPair', 'VideoMGroup', 'HardwarePair',
+    'HardwareVoipPair', 'AppGroup', 'Channel', 'Report', 'Receiver', 'Test',
+    'VPair', 'VTest'), 'wrapper'))
+VERSION = ('const', 'BRIDGE_VERSION')
+__all__ = sorted(EXPORTS) + ['__version__']
+
+
+def __getattr__(name):
+    # submodules and exported names are imported on first access
+    if name in SUBMODULES:
+        return import_module(f'.{name}', __name__)
+    if name == '__version__':
+        module, attr = VERSION
+        value = '.'.join(str(x) for x in getattr(__getattr__(module), attr))
+    elif name in EXPORTS:
+        value = getattr(__getattr__(EXPORTS[name]), name)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__) | SUBMODULES)
@@ -0,0 +1,391 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 09:12:37 2026
+
+@author: 皓
+"""
+# pylint: disable=import-outside-toplevel
+import os
+import sys
+import os.path as osp
+import logging
+import threading
+from .const import RetureCode
+from .common import read_members, add_members
+from .serialize import pack
+
+
+_SERVERS = {}
+_LOCK = threading.Lock()
+# one LogShipper per client connection
+_SHIPPERS = set()
+# level of the root logger before the first shipper changed it
+_ROOT_LEVEL = []
+
+
+def spawn(target, *args):
+    thread = threading.Thread(target=target, args=args, daemon=True)
+    thread.start()
+    return thread
+
+
+def serve_unix(path):
+    '''在Unix域套接字上提供classic服务'''
+    from rpyc.core.service import SlaveService
+    from rpyc.utils.server import ThreadedServer
+    with _LOCK:
+        if path in _SERVERS:
+            return path
+        if osp.exists(path):
+            os.remove(path)
+        server = ThreadedServer(SlaveService, socket_path=path,
+                                auto_register=False)
+        # listen before returning so the client can connect at once,
+        # start() listens again on the same socket, which is harmless
+        server.listener.listen(server.backlog)
+        spawn(server.start)
+        _SERVERS[path] = server
+    return path
+
+
+def _serve_pipe(name, stream):
+    import rpyc
+    from rpyc.core.stream import NamedPipeStream
+    while True:
+        stream.connect_server()
+        conn = rpyc.classic.connect_stream(stream)
+        try:
+            conn.serve_all()
+        finally:
+            conn.close()
+        stream = NamedPipeStream.create_server(name, connect=False)
+
+
+def serve_pipe(name):
+    '''在命名管道上提供classic服务'''
+    from rpyc.core.stream import NamedPipeStream
+    with _LOCK:
+        if name in _SERVERS:
+            return name
+        # create the first pipe instance before returning
+        stream = NamedPipeStream.create_server(name, connect=False)
+        _SERVERS[name] = spawn(_serve_pipe, name, stream)
+    return name
+
+
+def call_packed(api, name, *args, compress=False):
+    '''调用CHR函数并将输出参数打包为bytes返回'''
+    rc, *out = getattr(api, name)(*args)
+    if len(out) == 1 and isinstance(out[0], (list, tuple)):
+        out = out[0]
+    return rc, pack(out, compress=compress)
+
+
+def gather(api, name, args, compress=False):
+    '''
+    对每组参数调用同一个CHR函数, 返回打包后的返回码和结果.
+
+    *args* is a tuple of argument tuples (or of single handles).
+    '''
+    func = getattr(api, name)
+    codes = []
+    values = []
+    for item in args:
+        ret = func(*item) if isinstance(item, tuple) else func(item)
+        if isinstance(ret, (tuple, list)):
+            rc, value, *_ = ret
+        else:
+            rc, value = ret, 0
+        codes.append(rc)
+        values.append(value)
+    if any(isinstance(x, str) for x in values):
+        values = [x if isinstance(x, str) else '' for x in values]
+    else:
+        values = [0 if x is None else x for x in values]
+    return (pack(codes, 'i', compress=compress),
+            pack(values, compress=compress))
+
+
+def return_messages(api, codes):
+    '''一次获取多个返回码的说明, 返回((code, msg), ...), 跳过获取失败的'''
+    func = api.CHR_api_get_return_msg
+    messages = []
+    for code in codes:
+        rc, msg = func(code)
+        if rc == RetureCode.CHR_OK:
+            messages.append((code, msg))
+    return tuple(messages)
+
+
+class LogShipper(logging.Handler):
+    '''缓存日志记录, 按时间间隔或数量批量发送给客户端'''
+
+    def __init__(self, sink, interval=0.5, capacity=256):
+        super().__init__()
+        self.sink = sink
+        self.interval = interval
+        self.capacity = capacity
+        self.buffer = []
+        self.wakeup = threading.Event()
+        self.closed = False
+        self.thread = spawn(self.run)
+
+    def emit(self, record):
+        try:
+            exc_text = None
+            if record.exc_info:
+                exc_text = logging.Formatter().formatException(record.exc_info)
+            item = (record.name, record.levelno, record.getMessage(),
+                    record.created, exc_text)
+        except Exception:  # pylint: disable=broad-except
+            self.handleError(record)
+            return
+        with self.lock:
+            self.buffer.append(item)
+            full = len(self.buffer) >= self.capacity
+        if full:
+            self.wakeup.set()
+
+    def run(self):
+        while not self.closed:
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            batch, self.buffer = tuple(self.buffer), []
+        if not batch:
+            return
+        try:
+            self.sink(batch)
+        except Exception:  # pylint: disable=broad-except
+            # the client is gone, stop shipping
+            self.closed = True
+            stop_logs(self)
+
+    def close(self):
+        self.closed = True
+        self.wakeup.set()
+        super().close()
+
+
+class LogStream:
+    '''将写入的文本按行转为日志记录'''
+
+    def __init__(self, logger, level):
+        self.logger = logger
+        self.level = level
+        self.partial = ''
+
+    def write(self, text):
+        lines = (self.partial + text).split('\n')
+        self.partial = lines.pop()
+        for line in lines:
+            if line:
+                self.logger.log(self.level, line)
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def ship_logs(sink, interval=0.5, capacity=256, level=logging.NOTSET):
+    '''
+    将桥接端的日志和标准输出批量转发到*sink*.
+
+    *sink* receives tuples of (name, levelno, msg, created, exc_text); when it
+    is a remote callback it is called asynchronously. Each call adds a
+    shipper for one client and returns it for stop_logs(); the root logger
+    is set to the lowest level any client asked for.
+    '''
+    import rpyc
+    try:
+        sink = rpyc.async_(sink)
+    except TypeError:
+        pass
+    shipper = LogShipper(sink, interval, capacity)
+    shipper.setLevel(level)
+    root = logging.getLogger()
+    with _LOCK:
+        if not _SHIPPERS:
+            _ROOT_LEVEL[:] = [root.level]
+            sys.stdout = LogStream(logging.getLogger('stdout'), logging.INFO)
+            sys.stderr = LogStream(logging.getLogger('stderr'),
+                                   logging.ERROR)
+        _SHIPPERS.add(shipper)
+        root.addHandler(shipper)
+        set_root_level(root)
+    return shipper
+
+
+def set_root_level(root):
+    levels = [x.level for x in _SHIPPERS if x.level]
+    if levels:
+        root.setLevel(min(levels))
+    elif _ROOT_LEVEL:
+        root.setLevel(_ROOT_LEVEL[0])
+
+
+def stop_logs(shipper=None):
+    '''停止转发*shipper*, 为None时停止全部'''
+    root = logging.getLogger()
+    with _LOCK:
+        shippers = list(_SHIPPERS) if shipper is None else [shipper]
+        shippers = [x for x in shippers if x in _SHIPPERS]
+        for item in shippers:
+            _SHIPPERS.discard(item)
+            root.removeHandler(item)
+        if shippers and not _SHIPPERS:
+            # the last client stopped: restore the output and root level
+            sys.stdout = sys.__stdout__
+            sys.stderr = sys.__stderr__
+        set_root_level(root)
+        if not _SHIPPERS:
+            _ROOT_LEVEL.clear()
+    for item in shippers:
+        if not item.closed:
+            item.flush()
+        item.close()
+
+
+def pair_elapsed(api, pair):
+    '''最后一个timing record的elapsed, 失败时返回None'''
+    rc, count = api.CHR_pair_get_timing_record_count(pair)
+    if rc != RetureCode.CHR_OK:
+        return None
+    if count <= 0:
+        return 0
+    rc, record = api.CHR_pair_get_timing_record(pair, count - 1)
+    if rc != RetureCode.CHR_OK:
+        return None
+    rc, elapsed = api.CHR_timingrec_get_elapsed(record)
+    return elapsed if rc == RetureCode.CHR_OK else None
+
+
+def pair_values(api, pair):
+    '''
+    返回(elapsed, meas_time, bytes_sent_e1, bytes_recv_e1).
+
+    Each value is fetched on its own, a failed one is None.
+    '''
+    values = [pair_elapsed(api, pair)]
+    for name in ('CHR_common_results_get_meas_time',
+                 'CHR_common_results_get_bytes_sent_e1',
+                 'CHR_common_results_get_bytes_recv_e1'):
+        rc, value = getattr(api, name)(pair)
+        values.append(value if rc == RetureCode.CHR_OK else None)
+    return tuple(values)
+
+
+def pairs_stats(api, pairs, groups=None):
+    '''
+    一次遍历计算pairs的汇总结果.
+
+    Returns (count, errors, elapsed_max, meas_time_max, bytes_sent_e1,
+    bytes_recv_e1). *errors* counts the pairs with a failed value; a failed
+    value is left out of its statistic only, the other values of the pair
+    are kept. With *groups*, a tuple of keys parallel to *pairs*, a tuple of
+    (key, stats) is returned instead, one per distinct key.
+    '''
+    grouped = groups is not None
+    if not grouped:
+        groups = (None,) * len(pairs)
+    totals = {}
+    for pair, key in zip(pairs, groups):
+        stats = totals.get(key)
+        if stats is None:
+            stats = totals[key] = [0, 0, 0, 0, 0, 0]
+        values = pair_values(api, pair)
+        stats[0] += 1
+        if None in values:
+            stats[1] += 1
+        elapsed, meas_time, sent, recv = (0 if x is None else x
+                                          for x in values)
+        stats[2] = max(stats[2], elapsed)
+        stats[3] = max(stats[3], meas_time)
+        stats[4] += sent
+        stats[5] += recv
+    if not grouped:
+        return tuple(totals.get(None, (0, 0, 0, 0, 0, 0)))
+    return tuple((key, tuple(value)) for key, value in totals.items())
+
+
+# (prefix, get function) of the option objects copied by clone_test
+TEST_OPTIONS = (('runopts', 'CHR_test_get_runopts'),
+                ('dgopts', 'CHR_test_get_dgopts'))
+# option functions taking an index besides the handle and value
+INDEXED_OPTIONS = frozenset(('num_result_ranges', 'result_range'))
+
+
+def option_fields(names, prefix):
+    '''返回既有get又有set函数的选项名'''
+    getter = f'CHR_{prefix}_get_'
+    fields = (x[len(getter):] for x in names if x.startswith(getter))
+    return [x for x in fields if x not in INDEXED_OPTIONS
+            and f'CHR_{prefix}_set_{x}' in names]
+
+
+def copy_options(api, test, new_test):
+    '''复制runopts和dgopts, 返回(rc, 失败的函数名)'''
+    names = getattr(api, 'functions', None)
+    names = frozenset(names if names is not None else dir(api))
+    for prefix, get_name in TEST_OPTIONS:
+        rc, src = getattr(api, get_name)(test)
+        if rc != RetureCode.CHR_OK:
+            return rc, get_name
+        rc, dst = getattr(api, get_name)(new_test)
+        if rc != RetureCode.CHR_OK:
+            return rc, get_name
+        for field in option_fields(names, prefix):
+            where = f'CHR_{prefix}_get_{field}'
+            rc, value = getattr(api, where)(src)
+            if rc == RetureCode.CHR_OK:
+                where = f'CHR_{prefix}_set_{field}'
+                rc = getattr(api, where)(dst, value)
+            if rc != RetureCode.CHR_OK:
+                return rc, where
+    return RetureCode.CHR_OK, ''
+
+
+def clone_test(api, test, addresses=None, swap=False, groups=True):
+    '''
+    在桥接端将test的选项, pairs, mgroups和app groups复制到一个新test.
+
+    *addresses* is a tuple of (e1, e2) per pair overriding the endpoint
+    addresses, None keeps the copied value. *swap* swaps the endpoints of
+    each pair, with *groups* False only pairs are copied. The runopts and
+    dgopts are copied field by field. On failure the new test is deleted.
+    Returns (rc, new test handle or 0, failed function name).
+    '''
+    rc, new_test = api.CHR_test_new()
+    if rc != RetureCode.CHR_OK:
+        return rc, 0, 'CHR_test_new'
+    rc, where = copy_options(api, test, new_test)
+    if rc == RetureCode.CHR_OK:
+        rc, members, where = read_members(api, test, groups)
+    if rc == RetureCode.CHR_OK:
+        rc, where = add_members(api, new_test, members, addresses, swap)
+    if rc != RetureCode.CHR_OK:
+        api.CHR_test_delete(new_test)
+        return int(rc), 0, where
+    # plain int, an IntEnum would reach the client as a netref
+    return int(RetureCode.CHR_OK), new_test, ''
+
+
+def main():
+    '''在独立进程中运行桥接服务'''
+    from argparse import ArgumentParser
+    from rpyc.core.service import SlaveService
+    from rpyc.utils.server import ThreadedServer
+    parser = ArgumentParser(description='pychariot bridge worker')
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', '-p', type=int, default=18812)
+    args = parser.parse_args()
+    server = ThreadedServer(SlaveService, hostname=args.host, port=args.port,
+                            auto_register=False)
+    server.start()
+
+
+if __name__ == '__main__':
+    main()
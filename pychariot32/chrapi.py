@@ -51,8 +51,10 @@ class CHRAPI:
 
     @version.setter
     def version(self, value):
-        self._path = value
+        self._version = value
         ctypes_param.version = value
+        if 'dll' in self.__dict__:
+            self.functions = ctypes_param.get_functions(self.dll)
 
     @property
     def path(self):
@@ -64,6 +66,8 @@ class CHRAPI:
         # import API dll
         self.dll = CDLL(osp.join(self._path, self.DLLNAME))
         ctypes_param.init_cdll(self.dll)
+        # functions available for this DLL and version
+        self.functions = ctypes_param.get_functions(self.dll)
 
     def __getattr__(self, attr):
         if attr.startswith('CHR') and hasattr(self.dll, attr):
@@ -4,14 +4,23 @@ Created on Fri Sep 16 16:15:49 2022
 
 @author: 皓
 """
+import re
+import sys
 import os.path as osp
 import logging
 import locale
-from functools import wraps
+from functools import wraps, lru_cache
 import operator
+import itertools
+import threading
+from enum import Enum
+from queue import PriorityQueue
+from collections.abc import Sequence, Mapping
+from concurrent.futures import Future
 from ctypes import (CDLL, POINTER, create_string_buffer, create_unicode_buffer,
                     byref, c_int,  c_ulong, c_char_p, c_char, c_wchar,
                     c_wchar_p, cast)
+from .const import RetureCode
 
 try:
     ENCODING = locale.getencoding()
@@ -24,6 +33,32 @@ class UnSupportError(Exception):
     pass
 
 
+def parse_version(version):
+    '''将'7.10'等版本转换为可比较的整数元组'''
+    return tuple(int(x) for x in re.findall(r'\d+', str(version)))
+
+
+class CommitError(Exception):
+    '''暂存的属性写入失败, errors为{对象: {属性名: rc}}'''
+
+    def __init__(self, errors):
+        self.errors = errors
+        fields = '; '.join(
+            f'{obj!r} ' + ', '.join(f'{name}: rc = {rc}'
+                                    for name, rc in failed.items())
+            for obj, failed in errors.items())
+        super().__init__(f'Commit failed: {fields}')
+
+
+class CallError(Exception):
+    '''CHR函数返回错误, name为函数名, rc为返回码'''
+
+    def __init__(self, name, rc):
+        self.name = name
+        self.rc = rc
+        super().__init__(f'{name} failed: rc = {rc}')
+
+
 class BaseParam:
     def __init__(self, datatype):
         self.datatype = self._check_datatype(datatype)
@@ -194,6 +229,7 @@ class CHRDecorator(CFuncDecorator):
         super().__init__()
         self.vcontrol = {}
         self.version = None
+        self.tables = {}
 
     def check_version(self, name):
         if self.version is None:
@@ -201,10 +237,25 @@ class CHRDecorator(CFuncDecorator):
         if name not in self.vcontrol:
             return True
         _text, op, ver = self.vcontrol[name]
-        if op(self.version, ver):
+        # compare numerically, as strings '7.9' would sort after '7.10'
+        if op(parse_version(self.version), parse_version(ver)):
             return True
         return False
 
+    def get_functions(self, cdll_object):
+        '''
+        返回dll中存在且当前版本可用的函数名.
+
+        The table is computed once per DLL and version.
+        '''
+        key = (cdll_object._name, self.version)  # pylint: disable=protected-access
+        functions = self.tables.get(key)
+        if functions is None:
+            functions = self.tables[key] = frozenset(
+                x for x in self.params
+                if self.check_version(x) and hasattr(cdll_object, x))
+        return functions
+
     def raise_version(self, name):
         if self.check_version(name) is False:
             text, _op, ver = self.vcontrol[name]
@@ -306,3 +357,326 @@ def singleton(cls):
         return instances[cls]
 
     return get_instance
+
+
+class CallExecutor:
+    '''
+    由单一线程执行所有调用, 其他线程通过优先级队列提交并得到Future.
+
+    Lower priority values run first; calls with the same priority run in
+    submission order.
+    '''
+    HIGH = 0
+    NORMAL = 10
+    LOW = 20
+
+    def __init__(self, name='CallExecutor'):
+        self.queue = PriorityQueue()
+        self.counter = itertools.count()
+        self.thread = threading.Thread(target=self.run, name=name,
+                                       daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while True:
+            _priority, _count, future, func, args, kwargs = self.queue.get()
+            if future is None:
+                break
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(func(*args, **kwargs))
+            except BaseException as ex:  # pylint: disable=broad-except
+                future.set_exception(ex)
+
+    def submit(self, func, *args, priority=NORMAL, **kwargs):
+        future = Future()
+        self.queue.put((priority, next(self.counter), future, func, args,
+                        kwargs))
+        return future
+
+    def call(self, func, *args, priority=NORMAL, **kwargs):
+        if threading.current_thread() is self.thread:
+            return func(*args, **kwargs)
+        return self.submit(func, *args, priority=priority,
+                           **kwargs).result()
+
+    def shutdown(self, wait=True):
+        '''执行完已提交的调用后退出'''
+        self.queue.put((float('inf'), next(self.counter), None, None, None,
+                        None))
+        if wait and threading.current_thread() is not self.thread:
+            self.thread.join()
+
+
+class ChunkedSequence(Sequence):
+    '''
+    按块延迟解析的只读序列.
+
+    *fetch(start, stop)* returns the items of range(start, stop); *count* is
+    the length, or a callable returning it which is called on first use.
+    '''
+
+    def __init__(self, count, fetch, chunk_size=64):
+        self.count = count
+        self.fetch = fetch
+        self.chunk_size = chunk_size
+        self.items = None
+        self.loaded = set()
+
+    def __len__(self):
+        if callable(self.count):
+            self.count = self.count() or 0
+        return self.count
+
+    def __repr__(self):
+        return (f"<{self.__class__.__name__} {len(self)} items, "
+                f"{len(self.loaded)} chunks loaded>")
+
+    def load(self, index):
+        chunk = index // self.chunk_size
+        if chunk not in self.loaded:
+            if self.items is None:
+                self.items = [None] * len(self)
+            start = chunk * self.chunk_size
+            stop = min(start + self.chunk_size, len(self))
+            self.items[start:stop] = self.fetch(start, stop)
+            self.loaded.add(chunk)
+        return self.items[index]
+
+    def __getitem__(self, index):
+        size = len(self)
+        if isinstance(index, slice):
+            return tuple(self.load(x) for x in range(*index.indices(size)))
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError('sequence index out of range')
+        return self.load(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self.load(index)
+
+
+def is_missing(value):
+    '''None或NaN(DataFrame的空单元格)'''
+    return value is None or value != value  # pylint: disable=comparison-with-itself
+
+
+def table_rows(rows, columns=()):
+    '''
+    逐行返回dict, 跳过空单元格.
+
+    *rows* is an iterable of mappings or sequences (matched to *columns*), or
+    a pandas DataFrame which is read by records.
+    '''
+    if hasattr(rows, 'columns') and hasattr(rows, 'to_dict'):
+        rows = rows.to_dict('records')
+    for row in rows:
+        if not isinstance(row, Mapping):
+            row = zip(columns, row)
+        else:
+            row = row.items()
+        yield {k: v for k, v in row if not is_missing(v)}
+
+
+def plain_cell(value):
+    '''转换为rpyc按值传递的内置类型'''
+    if isinstance(value, Mapping):
+        return tuple((k, plain_cell(v)) for k, v in value.items())
+    if hasattr(value, 'item') and not isinstance(value, (str, bytes)):
+        # numpy scalars of DataFrame cells
+        return value.item()
+    return value
+
+
+def pack_rows(rows, columns=()):
+    '''
+    返回(columns, rows), rows为内置类型值的元组.
+
+    *rows* is read like table_rows. Columns missing from *columns* are
+    appended, missing cells are None. Tuples of builtins are passed by value
+    over rpyc, so a bridge client packs a table before handing it to the
+    bridge instead of letting the bridge iterate it remotely.
+    '''
+    rows = list(table_rows(rows, columns))
+    columns = list(columns)
+    for row in rows:
+        columns.extend(x for x in row if x not in columns)
+    return tuple(columns), tuple(tuple(plain_cell(row.get(x)) for x in columns)
+                                 for row in rows)
+
+
+def chunked(iterable, size):
+    '''按size分块'''
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+@lru_cache(maxsize=None)
+def decoder(datatype):
+    '''
+    返回datatype的转换函数, 枚举使用预先计算的值到成员查找表.
+
+    Values missing from the table fall back to datatype(value), which keeps
+    the ValueError of unknown values. Other types are returned unchanged.
+    '''
+    if not (isinstance(datatype, type) and issubclass(datatype, Enum)):
+        return datatype
+    table = {x.value: x for x in datatype}
+
+    def decode(value):
+        try:
+            return table[value]
+        except (KeyError, TypeError):
+            return datatype(value)
+    return decode
+
+
+def decode_array(datatype, values):
+    '''
+    批量转换数组, 如unpack得到的运行状态列.
+
+    A numpy array is decoded once per distinct value and returned as an
+    object array, anything else as a list.
+    '''
+    decode = decoder(datatype)
+    # an ndarray implies numpy is imported already
+    np = sys.modules.get('numpy')
+    if np is not None and isinstance(values, np.ndarray):
+        uniques, inverse = np.unique(values, return_inverse=True)
+        members = np.empty(len(uniques), dtype=object)
+        members[:] = [decode(x) for x in uniques.tolist()]
+        return members[inverse.reshape(values.shape)]
+    return list(map(decode, values))
+
+
+def set_addresses(api, pair, addresses):
+    '''设置pair的(e1, e2)地址, None保持原值, 返回rc'''
+    for name, addr in zip(('CHR_pair_set_e1_addr', 'CHR_pair_set_e2_addr'),
+                          addresses):
+        if addr is not None:
+            rc = getattr(api, name)(pair, str(addr))
+            if rc != RetureCode.CHR_OK:
+                return rc
+    return RetureCode.CHR_OK
+
+
+def swap_addresses(api, pair):
+    '''交换pair的e1, e2地址, 替代不支持的CHR_pair_swap_endpoints'''
+    rc, e1 = api.CHR_pair_get_e1_addr(pair)
+    if rc != RetureCode.CHR_OK:
+        return rc
+    rc, e2 = api.CHR_pair_get_e2_addr(pair)
+    if rc != RetureCode.CHR_OK:
+        return rc
+    return set_addresses(api, pair, (e2, e1))
+
+
+# replacements of CHR functions missing from the DLL or its version, called
+# with the raw api first, {name: function}
+FALLBACKS = {'CHR_pair_swap_endpoints': swap_addresses}
+
+
+def has_function(api, name):
+    '''
+    api是否提供name.
+
+    The table of the DLL and version (CHRAPI.functions) is used when the api
+    has one, otherwise has_func.
+    '''
+    functions = getattr(api, 'functions', None)
+    if functions is not None:
+        return name in functions
+    return api.has_func(name)
+
+
+def fallback_function(api, name):
+    '''返回绑定api的FALLBACKS[name], 与原函数同名'''
+    fallback = FALLBACKS[name]
+
+    def func(*args):
+        return fallback(api, *args)
+    func.__name__ = name
+    return func
+
+
+def get_function(api, name):
+    '''返回api的name函数, 缺少时返回替代函数'''
+    if name in FALLBACKS and not has_function(api, name):
+        return fallback_function(api, name)
+    return getattr(api, name)
+
+
+# (kind, count function, get function, add function) of the objects a test
+# contains, copied by bridge.clone_test and wrapper.TestTemplate
+TEST_MEMBERS = (
+    ('pair', 'CHR_test_get_pair_count', 'CHR_test_get_pair',
+     'CHR_test_add_pair'),
+    ('mgroup', 'CHR_test_get_mgroup_count', 'CHR_test_get_mgroup',
+     'CHR_test_add_mgroup'),
+    ('app_group', 'CHR_test_get_app_group_count',
+     'CHR_test_get_app_group_by_index', 'CHR_test_add_app_group'),
+)
+
+
+def read_members(api, test, groups=True):
+    '''
+    读取test包含的对象句柄, 返回(rc, members, 失败的函数名).
+
+    *members* holds (kind, handles, add function) per TEST_MEMBERS entry,
+    only the pairs with *groups* False.
+    '''
+    members = []
+    for kind, count_name, get_name, add_name in (
+            TEST_MEMBERS if groups else TEST_MEMBERS[:1]):
+        rc, count = getattr(api, count_name)(test)
+        if rc != RetureCode.CHR_OK:
+            return rc, (), count_name
+        handles = []
+        for index in range(count):
+            rc, handle = getattr(api, get_name)(test, index)
+            if rc != RetureCode.CHR_OK:
+                return rc, (), get_name
+            handles.append(handle)
+        members.append((kind, tuple(handles), add_name))
+    return RetureCode.CHR_OK, tuple(members), ''
+
+
+def add_members(api, test, members, addresses=None, swap=False):
+    '''
+    将read_members读取的对象复制到test, 返回(rc, 失败的函数名).
+
+    *addresses* is a tuple of (e1, e2) per pair overriding the endpoint
+    addresses, *swap* swaps the endpoints of each pair. A copy which
+    failed is deleted.
+    '''
+    swap_endpoints = (get_function(api, 'CHR_pair_swap_endpoints')
+                      if swap else None)
+    for kind, handles, add_name in members:
+        for index, src in enumerate(handles):
+            rc, dst = getattr(api, f'CHR_{kind}_new')()
+            if rc != RetureCode.CHR_OK:
+                return rc, f'CHR_{kind}_new'
+            where = f'CHR_{kind}_copy'
+            rc = getattr(api, where)(dst, src)
+            if rc == RetureCode.CHR_OK and kind == 'pair':
+                if swap:
+                    where = 'CHR_pair_swap_endpoints'
+                    rc = swap_endpoints(dst)
+                if (rc == RetureCode.CHR_OK and addresses is not None
+                        and index < len(addresses)):
+                    where = 'CHR_pair_set_addr'
+                    rc = set_addresses(api, dst, addresses[index])
+            if rc == RetureCode.CHR_OK:
+                where = add_name
+                rc = getattr(api, add_name)(test, dst)
+            if rc != RetureCode.CHR_OK:
+                getattr(api, f'CHR_{kind}_delete')(dst)
+                return rc, where
+    return RetureCode.CHR_OK, ''
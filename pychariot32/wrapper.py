@@ -5,10 +5,18 @@ Created on Wed Mar 13 16:46:43 2024
 @author: 皓
 """
 # pylint: disable=too-few-public-methods,too-many-public-methods,too-many-lines,no-else-return,R0801
+import os.path as osp
+from enum import Enum
 from typing import get_type_hints
+from weakref import WeakValueDictionary
 from functools import lru_cache, wraps
+from contextlib import contextmanager
+from concurrent.futures import Future
 from .chrapi import CHRAPI
-from .common import singleton
+from .common import (singleton, CallExecutor, CommitError, CallError,
+                     ChunkedSequence, table_rows, chunked, decoder,
+                     FALLBACKS, has_function, fallback_function,
+                     read_members, add_members)
 from .const import (RetureCode, CHR_NULL_HANDLE, CHR_PROTOCOL, CHR_VOIP_CODEC,
                     CHR_VIDEO_CODEC, CHR_DETAIL_LEVEL, CHR_THROUGHPUT_UNITS,
                     CHR_TEST_END, CHR_TEST_HOW_ENDED, CHR_TEST_REPORTING,
@@ -19,13 +27,37 @@ from .const import (RetureCode, CHR_NULL_HANDLE, CHR_PROTOCOL, CHR_VOIP_CODEC,
 from .utils import ToolKit
 
 CHR_DETAIL_LEVEL_ALL = CHR_DETAIL_LEVEL.CHR_DETAIL_LEVEL_ALL
+# calls which jump ahead of queued calls in executor mode
+HIGH_PRIORITY = ('test_stop', 'test_abandon', 'test_force_delete',
+                 'tracert_pair_stop')
+# live wrapper objects by (class, handle), one object per handle
+HANDLE_OBJECTS = WeakValueDictionary()
+# property writes staged in a transaction by (class, handle), shared by every
+# wrapper object of the handle, {key: {attr: value}}
+STAGED_WRITES = {}
+# cached configuration values by (class, handle), shared by every wrapper
+# object of the handle
+CONFIG_CACHE = {}
+# handles of collected objects waiting for release_pending(), as (class, handle)
+RELEASE_QUEUE = {}
+# calls which replace the objects contained by a test
+RELOAD_CALLS = ('load', 'load_app_groups')
+
+
+def get_priority(name):
+    if name.startswith('CHR_'):
+        name = name[4:]
+    if name in HIGH_PRIORITY:
+        return CallExecutor.HIGH
+    return CallExecutor.NORMAL
 
 
 def chr_api_wrapper(self, func):
+    priority = get_priority(func.__name__)
 
     @wraps(func)
     def wrapper(*args, **kwargs):
-        ret = func(*args, **kwargs)
+        ret = self.call(func, *args, priority=priority, **kwargs)
         if isinstance(ret, (tuple, list)):
             rc, *out = ret
         else:
@@ -45,10 +77,21 @@ def chr_api_wrapper(self, func):
     return wrapper
 
 
+def executor_wrapper(self, func):
+    priority = get_priority(func.__name__)
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        return self.call(func, *args, priority=priority, **kwargs)
+    return wrapper
+
+
 @singleton
 class CHRAPIWrapper:
     def __init__(self, path=None, version=None,
-                 detail_level: CHR_DETAIL_LEVEL = CHR_DETAIL_LEVEL_ALL):
+                 detail_level: CHR_DETAIL_LEVEL = CHR_DETAIL_LEVEL_ALL,
+                 executor: bool = False):
+        self.executor = None
         if not path:
             path = ToolKit.get_chrapi_dir()
         if not version:
@@ -56,8 +99,51 @@ class CHRAPIWrapper:
         if not path:
             raise FileNotFoundError("Can't find Ixia ixChariot install path")
         self.chrapi = CHRAPI(path, version)
+        for name in FALLBACKS:
+            if not has_function(self.chrapi, name):
+                func = fallback_function(self.chrapi, name)
+                setattr(self, name, executor_wrapper(self, func))
+                setattr(self, name[4:], chr_api_wrapper(self, func))
+        if executor:
+            self.start_executor()
         self.api_initialize(detail_level)
 
+    def start_executor(self):
+        '''Run all DLL calls on one owner thread.'''
+        if self.executor is None:
+            self.executor = CallExecutor('CHRAPI')
+
+    def stop_executor(self, wait=True):
+        executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait)
+
+    def call(self, func, *args, priority=CallExecutor.NORMAL, **kwargs):
+        executor = self.executor
+        if executor is None:
+            return func(*args, **kwargs)
+        return executor.call(func, *args, priority=priority, **kwargs)
+
+    def submit(self, attr: str, *args, priority=None, **kwargs) -> Future:
+        '''
+        Submit a call by name and return a Future.
+
+        In executor mode the call is queued with *priority* (by default
+        HIGH for stop/abandon calls), otherwise it runs at once.
+        '''
+        func = getattr(self, attr)
+        if priority is None:
+            priority = get_priority(attr)
+        executor = self.executor
+        if executor is not None:
+            return executor.submit(func, *args, priority=priority, **kwargs)
+        future = Future()
+        try:
+            future.set_result(func(*args, **kwargs))
+        except Exception as ex:  # pylint: disable=broad-except
+            future.set_exception(ex)
+        return future
+
     @lru_cache()
     def dir(self):
         result = []
@@ -73,7 +159,10 @@ class CHRAPIWrapper:
         cls_name = self.__class__.__name__
         if attr.startswith('CHR_'):
             if hasattr(self.chrapi, attr):
-                return getattr(self.chrapi, attr)
+                wrapper = executor_wrapper(self, getattr(self.chrapi, attr))
+                # cache the wrapper, later lookups skip __getattr__
+                setattr(self, attr, wrapper)
+                return wrapper
             else:
                 cls_name = 'CHRAPI'
         else:
@@ -81,53 +170,154 @@ class CHRAPIWrapper:
             if hasattr(self.chrapi, chr_name):
                 func = getattr(self.chrapi, chr_name)
                 wrapper = chr_api_wrapper(self, func)
+                setattr(self, attr, wrapper)
                 return wrapper
         raise AttributeError(f"'{cls_name}' object has no attribute '{attr}'")
 
 
-def readonly_property(name, datatype=None):
-    """Create a readonly property with getter methods."""
+class ReadonlyProperty:
+    """
+    Readonly property calling {PREFIX}_get_{name}.
+
+    The CHR function is looked up once per owner class and cached, so an
+    access costs one call plus the DLL call. A *cached* property is served
+    from CONFIG_CACHE for objects which enabled the configuration cache.
+    """
+    CACHED = False
+
+    def __init__(self, name, datatype=None, cached=None):
+        self.name = name
+        self.datatype = datatype
+        self.decode = decoder(datatype)
+        self.cached = self.CACHED if cached is None else cached
+        self.attr = name
+        self.getters = {}
+
+    def __set_name__(self, owner, attr):
+        self.attr = attr
+
+    def resolve(self, cls, action):
+        """Return the CHR function of *cls* and whether it takes a handle."""
+        func = getattr(cls.api, f"{cls.PREFIX}_{action}_{self.name}")
+        return func, issubclass(cls, BaseHandleCHR)
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        if STAGED_WRITES:
+            staged = STAGED_WRITES.get(config_key(obj))
+            if staged is not None and self.attr in staged:
+                value = staged[self.attr]
+                if (self.decode is None or value is None
+                        or isinstance(value, BaseHandleCHR)):
+                    return value
+                return self.decode(value)
+        cache = None
+        if CONFIG_CACHE and self.cached:
+            cache = CONFIG_CACHE.get(config_key(obj))
+            if cache is not None and self.attr in cache:
+                return cache[self.attr]
+        cls = type(obj)
+        try:
+            func, with_handle = self.getters[cls]
+        except KeyError:
+            func, with_handle = self.getters[cls] = self.resolve(cls, 'get')
+        result = func(obj.handle) if with_handle else func()
+        if self.decode is not None and result is not None:
+            result = self.decode(result)
+        if cache is not None and result is not None:
+            cache[self.attr] = result
+        return result
+
+    def __set__(self, obj, value):
+        raise AttributeError(f"property '{self.attr}' of "
+                             f"'{type(obj).__name__}' object has no setter")
+
+
+class Property(ReadonlyProperty):
+    """Property calling {PREFIX}_get_{name} and {PREFIX}_set_{name}."""
+    CACHED = True
+
+    def __init__(self, name, datatype=None, cached=None):
+        super().__init__(name, datatype, cached)
+        self.setters = {}
+
+    def __set__(self, obj, value):
+        if STAGED_WRITES:
+            staged = STAGED_WRITES.get(config_key(obj))
+            if staged is not None:
+                staged[self.attr] = value
+                return None
+        if CONFIG_CACHE:
+            invalidate_config(obj, self.attr)
+        cls = type(obj)
+        try:
+            func, with_handle = self.setters[cls]
+        except KeyError:
+            func, with_handle = self.setters[cls] = self.resolve(cls, 'set')
+        if with_handle:
+            param = value.handle if isinstance(value, BaseHandleCHR) else value
+            return func(obj.handle, param)
+        return func(value)
 
-    def getter(self):
-        """Getter method for the property."""
-        func = getattr(self.api, f"{self.PREFIX}_get_{name}")
-        if isinstance(self, BaseHandleCHR):
-            result = func(self.handle)
-        else:
-            result = func()
-        if datatype is None:
-            return result
-        else:
-            return datatype(result) if result is not None else result
 
-    return property(getter)
+def readonly_property(name, datatype=None, cached=False):
+    """Create a readonly property with getter methods."""
+    return ReadonlyProperty(name, datatype, cached)
 
 
 def property_factory(name, datatype=None):
     """Create a property with getter and setter methods."""
+    return Property(name, datatype)
 
-    def getter(self):
-        """Getter method for the property."""
-        func = getattr(self.api, f"{self.PREFIX}_get_{name}")
-        if isinstance(self, BaseHandleCHR):
-            result = func(self.handle)
-        else:
-            result = func()
-        if datatype is None:
-            return result
-        else:
-            return datatype(result) if result is not None else result
 
-    def setter(self, value):
-        """Setter method for the property."""
-        func = getattr(self.api, f"{self.PREFIX}_set_{name}")
-        if isinstance(self, BaseHandleCHR):
-            param = value.handle if isinstance(value, BaseHandleCHR) else value
-            return func(self.handle, param)
-        else:
-            return func(value)
+def plain_value(value):
+    """Return enums as their values and objects as their handles."""
+    if isinstance(value, BaseHandleCHR):
+        return value.handle
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def config_key(obj):
+    return (type(obj), getattr(obj, 'handle', None))
+
 
-    return property(getter, setter)
+def invalidate_config(obj, *attrs):
+    """Drop cached values of *obj*, all of them if no *attrs* are given."""
+    cache = CONFIG_CACHE.get(config_key(obj))
+    if cache is None:
+        return
+    if not attrs:
+        cache.clear()
+    for attr in attrs:
+        cache.pop(attr, None)
+
+
+def invalidate_call(func_name, obj, args):
+    """Drop cached values changed by a call to *func_name*."""
+    if func_name in RELOAD_CALLS:
+        for cache in CONFIG_CACHE.values():
+            cache.clear()
+        return
+    if func_name.startswith(('get_', 'is_', 'results_get_', 'query_')):
+        return
+    invalidate_config(obj)
+    for arg in args:
+        if isinstance(arg, BaseHandleCHR):
+            invalidate_config(arg)
+
+
+def transfer_ownership(args):
+    """Objects added to a container are deleted with it, not by the wrapper."""
+    for arg in args:
+        if isinstance(arg, HandleCHR):
+            arg.owned = False
+
+
+def get_items(getter, start, stop):
+    return [getter(x) for x in range(start, stop)]
 
 
 def parse_args(*args):
@@ -136,12 +326,20 @@ def parse_args(*args):
 
 def api(func):
     func_name = func.__name__
-    return_type = get_type_hints(func).get('return')
+    return_type = decoder(get_type_hints(func).get('return'))
+
+    methods = {}
 
     @wraps(func)
     def wrapper(self, *args, **kwargs):
-        method = getattr(self.api, f"{self.PREFIX}_{func_name}")
+        cls = type(self)
+        method = methods.get(cls)
+        if method is None:
+            method = methods[cls] = getattr(cls.api,
+                                            f"{cls.PREFIX}_{func_name}")
         result = method(*parse_args(*args), **kwargs)
+        if CONFIG_CACHE:
+            invalidate_call(func_name, self, args)
         func(self, *args, **kwargs)
         if result is not None:
             return return_type(result) if return_type is not None else result
@@ -155,14 +353,23 @@ def handle_api(obj):
 
     def handle_api_wrapper(func):
         func_name = func.__name__
-        return_type = get_type_hints(func).get('return')
+        return_type = decoder(get_type_hints(func).get('return'))
+        methods = {}
 
         @wraps(func)
         def wrapper(self, *args, **kwargs):
             assert self.handle is not None, 'Handle is null'
-            prefix = self.PREFIX if callable(obj) else obj
-            method = getattr(self.api, f"{prefix}_{func_name}")
+            cls = type(self)
+            method = methods.get(cls)
+            if method is None:
+                prefix = cls.PREFIX if callable(obj) else obj
+                method = methods[cls] = getattr(cls.api,
+                                                f"{prefix}_{func_name}")
             result = method(self.handle, *parse_args(*args), **kwargs)
+            if CONFIG_CACHE:
+                invalidate_call(func_name, self, args)
+            if func_name.startswith('add_'):
+                transfer_ownership(args)
             func(self, *args, **kwargs)
             if result is not None:
                 return result if return_type is None else return_type(result)
@@ -172,11 +379,22 @@ def handle_api(obj):
     return handle_api_wrapper(obj) if callable(obj) else handle_api_wrapper
 
 
-class BaseCHR:
-    PREFIX = ''
+class ApiDescriptor:
+    """Resolve the CHRAPIWrapper singleton at class level."""
 
     def __init__(self):
-        self.api = CHRAPIWrapper()
+        self.wrapper = None
+
+    def __get__(self, obj, objtype=None):
+        if self.wrapper is None:
+            self.wrapper = CHRAPIWrapper()
+        return self.wrapper
+
+
+class BaseCHR:
+    __slots__ = ()
+    PREFIX = ''
+    api = ApiDescriptor()
 
 
 @singleton
@@ -306,6 +524,8 @@ class CommonErrorMixin:
     errors, not just those with extended information, so that you can later
     debug your programs that use the IxChariot API
     '''
+    __slots__ = ()
+
     @handle_api('common')
     def error_get_info(self, detail: int):
         pass
@@ -361,6 +581,7 @@ class CommonHandleMixin:
     are common to endpoint pairs, multicast pairs, and timing records for
     either pair type (that is, normal pair or multicast pair).
     '''
+    __slots__ = ()
 
     @handle_api('common')
     def results_get_bytes_recv_e1(self):
@@ -488,31 +709,134 @@ class CommonHandleMixin:
 
 
 class BaseHandleCHR(BaseCHR):
+    __slots__ = ('handle', '__weakref__')
+    # plain records are cheaper to create again than to keep in the map
+    IDENTITY_MAP = False
+
+    def __new__(cls, handle=None):
+        # return the existing wrapper of a handle instead of a new one
+        if handle is not None and cls.IDENTITY_MAP:
+            obj = HANDLE_OBJECTS.get((cls, handle))
+            if obj is not None:
+                return obj
+        return super().__new__(cls)
+
     def __init__(self, handle):
         super().__init__()
-        self.handle = handle
+        self.bind_handle(handle)
 
     def __repr__(self):
         return f"<{self.__class__.__name__} object [handle {self.handle}]>"
 
+    def sequence(self, count_attr, getter, chunk_size=64):
+        """Lazy view of contained objects, each chunk resolved in one call."""
+        def fetch(start, stop):
+            return self.api.call(get_items, getter, start, stop)
+        return ChunkedSequence(lambda: getattr(self, count_attr), fetch,
+                               chunk_size)
+
+    def bind_handle(self, handle):
+        """Set the handle and register the object in the identity map."""
+        self.handle = handle
+        if self.IDENTITY_MAP and handle not in (None, CHR_NULL_HANDLE):
+            HANDLE_OBJECTS[(type(self), handle)] = self
+            if RELEASE_QUEUE:
+                # wrapped again before its queued release, keep it
+                RELEASE_QUEUE.pop((type(self), handle), None)
+
+    def delete_handle(self, action='delete'):
+        """Call {PREFIX}_{action}, the handle is released only on success."""
+        rc = getattr(self.api, f"CHR_{self.PREFIX}_{action}")(self.handle)
+        if rc == RetureCode.CHR_OK:
+            self.release_handle()
+        return rc
+
+    def release_handle(self):
+        """Remove the object from the identity map and clear the handle."""
+        key = (type(self), self.handle)
+        if HANDLE_OBJECTS.get(key) is self:
+            del HANDLE_OBJECTS[key]
+        CONFIG_CACHE.pop(key, None)
+        STAGED_WRITES.pop(key, None)
+        self.handle = None
+
 
 class HandleCHR(BaseHandleCHR):
+    """
+    Wrapper of a handle which can be deleted.
+
+    Only a wrapper which created its handle owns it and queues it for
+    deletion when collected. Wrappers of existing handles, such as those
+    returned by container getters like Test.get_pair, do not own them, and
+    adding an object to a container passes the ownership to the container.
+    """
+    __slots__ = ('owned',)
+    IDENTITY_MAP = True
+
     def __init__(self, handle=None):
         super(BaseHandleCHR, self).__init__()
         if handle is None:
+            # creating objects is a safe point to delete released handles
+            release_pending()
             handle = self.new()
-        self.handle = handle
+            owned = True
+        else:
+            # an existing wrapper keeps its ownership, and a handle queued
+            # by its collected owner is taken over instead of deleted
+            owned = (getattr(self, 'owned', False)
+                     or RELEASE_QUEUE.pop((type(self), handle), 0) is None)
+        self.bind_handle(handle)
+        self.owned = owned
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def __del__(self):
-        if self.handle is not None:
-            if hasattr(self, 'delete'):
-                self.delete()
-            self.handle = None
+        # queue the handle instead of calling the DLL from the collector
+        handle = getattr(self, 'handle', None)
+        if (handle is not None and getattr(self, 'owned', False)
+                and hasattr(self, 'delete')):
+            RELEASE_QUEUE[(type(self), handle)] = None
+
+    def close(self):
+        """Delete the handle now, then the queued released handles."""
+        if self.handle is not None and hasattr(self, 'delete'):
+            self.delete()
+        release_pending()
 
     def new(self):
         return 0
 
 
+def delete_handles(items):
+    api_wrapper = BaseCHR.api
+    for cls, handle in items:
+        CONFIG_CACHE.pop((cls, handle), None)
+        STAGED_WRITES.pop((cls, handle), None)
+        getattr(api_wrapper, f"{cls.PREFIX}_delete")(handle)
+
+
+def release_pending():
+    """
+    Delete the handles of collected objects in one batched call.
+
+    Called when objects are created or closed; call it at other points which
+    are safe for DLL calls. Returns the number of deleted handles.
+    """
+    if not RELEASE_QUEUE:
+        return 0
+    items = []
+    for key in list(RELEASE_QUEUE):
+        if RELEASE_QUEUE.pop(key, 0) is None:
+            items.append(key)
+    if items:
+        BaseCHR.api.call(delete_handles, items)
+    return len(items)
+
+
 class IxiaNetworkMixin:
     '''
     Ixia Network Configuration Functions
@@ -521,6 +845,7 @@ class IxiaNetworkMixin:
     configurations into a test object and export Ixia network configurations
     that are part of a test object.
     '''
+    __slots__ = ()
     ixia_network_configuration = property_factory('ixia_network_configuration')
 
     @handle_api
@@ -536,7 +861,173 @@ class IxiaNetworkMixin:
         pass
 
 
-class DatagramOptions(BaseHandleCHR):
+class ConfigMixin:
+    '''
+    Configuration Snapshot
+    ---------------------------------------------------------------------------
+    Read or write every read-write property of an object at once. All calls
+    of a snapshot run as one job on the owner thread in executor mode, and as
+    one remote call when the object lives in the bridge process.
+
+    Snapshots are tuples of (name, value) pairs of plain values, enums as
+    their values and objects as their handles, which rpyc passes by value.
+    A client of the bridge builds the dict locally with
+    dict(obj.config_items()) instead of calling to_dict remotely.
+    '''
+    __slots__ = ()
+
+    @classmethod
+    @lru_cache()
+    def config_fields(cls):
+        """Names of the read-write properties, in definition order."""
+        fields = {}
+        for klass in reversed(cls.__mro__):
+            for attr, value in vars(klass).items():
+                if isinstance(value, Property):
+                    fields[attr] = value
+                elif attr in fields:
+                    del fields[attr]
+        return tuple(fields)
+
+    def read_fields(self, names):
+        return tuple((x, plain_value(getattr(self, x))) for x in names)
+
+    def write_fields(self, items):
+        for name, value in items:
+            if value is not None:
+                setattr(self, name, value)
+
+    def config_items(self):
+        """Return (name, value) pairs of every read-write property."""
+        return self.api.call(self.read_fields, self.config_fields())
+
+    def to_dict(self):
+        """Return the value of every read-write property."""
+        return dict(self.config_items())
+
+    def from_dict(self, values):
+        """
+        Write the properties in *values*, None values are skipped.
+
+        *values* is a dict or (name, value) pairs.
+        """
+        items = tuple(values.items() if hasattr(values, 'items') else values)
+        fields = self.config_fields()
+        unknown = [x for x, _ in items if x not in fields]
+        if unknown:
+            raise ValueError(f'Unknown property: {", ".join(unknown)}')
+        self.api.call(self.write_fields, items)
+        return self
+
+    def flush_fields(self, items, compare=True):
+        """
+        Write staged (name, value) pairs with the raw CHR functions.
+
+        Values equal to the current value are skipped, unless *compare* is
+        false for items already diffed by the caller. Returns the return
+        code of each failed write.
+        """
+        errors = {}
+        chrapi = self.api.chrapi
+        cls = type(self)
+        cache = CONFIG_CACHE.get(config_key(self), {})
+        for attr, value in items:
+            name = getattr(cls, attr).name
+            param = value.handle if isinstance(value, BaseHandleCHR) else value
+            if not compare:
+                unchanged = False
+            elif attr in cache:
+                unchanged = cache[attr] == value
+            else:
+                rc, current = getattr(
+                    chrapi, f"CHR_{self.PREFIX}_get_{name}")(self.handle)
+                unchanged = rc == RetureCode.CHR_OK and current == param
+            if unchanged:
+                continue
+            cache.pop(attr, None)
+            rc = getattr(chrapi, f"CHR_{self.PREFIX}_set_{name}")(
+                self.handle, param)
+            if rc != RetureCode.CHR_OK:
+                errors[attr] = rc
+        return errors
+
+    def begin(self):
+        """Stage property writes until commit() or rollback()."""
+        STAGED_WRITES.setdefault(config_key(self), {})
+        return self
+
+    def commit(self):
+        commit_all(self)
+
+    def rollback(self):
+        STAGED_WRITES.pop(config_key(self), None)
+
+    def transaction(self):
+        return transaction(self)
+
+    def cache_config(self, enable=True):
+        """
+        Serve repeated reads of configuration properties locally.
+
+        Cached values are dropped by the matching setter, by calls which
+        change the object and by Test.load. The cache belongs to the
+        handle, so every wrapper object of it shares the cache until the
+        handle is deleted or released.
+
+        The cache is opt-in, no path of the package enables it. Code which
+        reads the same fields many times, such as a report over the pairs
+        of a test, enables it on those objects first.
+        """
+        if enable:
+            CONFIG_CACHE.setdefault(config_key(self), {})
+        else:
+            CONFIG_CACHE.pop(config_key(self), None)
+        return self
+
+
+def flush_all(staged):
+    errors = {}
+    for obj, items in staged:
+        failed = obj.flush_fields(items)
+        if failed:
+            errors[obj] = failed
+    return errors
+
+
+def commit_all(*objects):
+    """
+    Flush the staged writes of *objects* as one batched call.
+
+    Raises CommitError with the return code of every failed write.
+    """
+    staged = ((x, STAGED_WRITES.pop(config_key(x), None)) for x in objects)
+    staged = tuple((x, tuple(values.items())) for x, values in staged if values)
+    if not staged:
+        return
+    errors = BaseCHR.api.call(flush_all, staged)
+    if errors:
+        raise CommitError(errors)
+
+
+@contextmanager
+def transaction(*objects):
+    """
+    Stage property writes of *objects* and commit them on exit.
+
+    The writes are discarded if the block raises, and nothing stays staged
+    after the block in any case.
+    """
+    for obj in objects:
+        obj.begin()
+    try:
+        yield objects[0] if len(objects) == 1 else objects
+        commit_all(*objects)
+    finally:
+        for obj in objects:
+            obj.rollback()
+
+
+class DatagramOptions(BaseHandleCHR, ConfigMixin):
     '''
     Datagram Options Object Functions
     ---------------------------------------------------------------------------
@@ -544,6 +1035,7 @@ class DatagramOptions(BaseHandleCHR):
     datagram options for the test that owns them. You cannot set datagram
     options for a test that has results or while a test is running.
     '''
+    __slots__ = ()
     PREFIX = 'dgopts'
     recv_timeout = property_factory('recv_timeout')
     retrans_count = property_factory('retrans_count')
@@ -557,7 +1049,7 @@ class DatagramOptions(BaseHandleCHR):
     RTP_use_extended_headers = property_factory('RTP_use_extended_headers')
 
 
-class RunOptions(BaseHandleCHR):
+class RunOptions(BaseHandleCHR, ConfigMixin):
     '''
     Run Options Object Functions
     ---------------------------------------------------------------------------
@@ -565,6 +1057,7 @@ class RunOptions(BaseHandleCHR):
     options that are set for a specified test. You are not allowed to set run
     options for a test that has results or while a test is running.
     '''
+    __slots__ = ()
     PREFIX = 'runopts'
     connect_timeout = property_factory('connect_timeout')
     CPU_util = property_factory('CPU_util')
@@ -629,6 +1122,7 @@ class HopRecord(BaseHandleCHR):
     Individual hop records contain the hop number, the average hop latency,
     the hop address, and the resolved hop name.
     '''
+    __slots__ = ()
     PREFIX = 'hoprec'
     hop_address = readonly_property('hop_address')
     hop_latency = readonly_property('hop_latency')
@@ -645,6 +1139,7 @@ class TimingRecord(BaseHandleCHR):
     stored in timing records can be obtained using common results extraction
     functions.
     '''
+    __slots__ = ()
     PREFIX = 'timingrec'
     elapsed = readonly_property('elapsed')
     end_to_end_delay = readonly_property('end_to_end_delay')
@@ -677,10 +1172,12 @@ class PairTimingRecord(TimingRecord, CommonHandleMixin):
     stored in timing records can be obtained using common results extraction
     functions.
     '''
-    pass
+    __slots__ = ()
 
 
 class BasePair(HandleCHR, CommonHandleMixin):
+    __slots__ = ()
+
     @handle_api('pair')
     def results_get_average(self, result_type: int):
         pass
@@ -710,7 +1207,7 @@ class BasePair(HandleCHR, CommonHandleMixin):
         pass
 
 
-class MPair(BasePair):
+class MPair(BasePair, ConfigMixin):
     '''
     Multicast Pair Object Functions
     ---------------------------------------------------------------------------
@@ -719,6 +1216,7 @@ class MPair(BasePair):
     any multicast pair information for a multicast pair that is owned by
     multicast group.
     '''
+    __slots__ = ()
     PREFIX = 'mpair'
     timing_record_count = readonly_property('timing_record_count')
     runStatus = readonly_property('runStatus', CHR_PAIR_RUNSTATUS_TYPE)
@@ -726,9 +1224,8 @@ class MPair(BasePair):
     setup_e1_e2_addr = property_factory('setup_e1_e2_addr')
     use_setup_e1_e2_values = property_factory('use_setup_e1_e2_values')
 
-    @handle_api
     def delete(self):
-        self.handle = None
+        return self.delete_handle()
 
     @handle_api
     def get_e2_config_value(self, parameter: int):
@@ -747,7 +1244,7 @@ class MPair(BasePair):
         pass
 
 
-class Pair(BasePair):
+class Pair(BasePair, ConfigMixin):
     '''
     Pair Object Functions
     ---------------------------------------------------------------------------
@@ -757,10 +1254,11 @@ class Pair(BasePair):
     Some functions apply to VoIP pairs; seeVoIP Pair Object on page 2-16 for
     more information.
     '''
+    __slots__ = ()
     PREFIX = 'pair'
-    appl_script_name = readonly_property('appl_script_name')
+    appl_script_name = readonly_property('appl_script_name', cached=True)
     runStatus = readonly_property('runStatus', CHR_PAIR_RUNSTATUS_TYPE)
-    script_filename = readonly_property('script_filename')
+    script_filename = readonly_property('script_filename', cached=True)
     timing_record_count = readonly_property('timing_record_count')
     comment = property_factory('comment')
     console_e1_addr = property_factory('console_e1_addr')
@@ -779,9 +1277,8 @@ class Pair(BasePair):
     def copy(self, to_pair_handle: int, from_pair_handle: int):
         pass
 
-    @handle_api
     def delete(self):
-        self.handle = None
+        return self.delete_handle()
 
     @handle_api
     def get_e1_config_value(self, parameter: int):
@@ -851,7 +1348,7 @@ class Pair(BasePair):
         pass
 
 
-class MGroup(HandleCHR):
+class MGroup(HandleCHR, ConfigMixin):
     '''Multicast Group Object Functions
     ---------------------------------------------------------------------------
     The multicast group object functions are used to define and retrieve
@@ -860,10 +1357,11 @@ class MGroup(HandleCHR):
     called multicast pairs (mpairs). You cannot add members to or set the
     attributes of a multicast group object that is contained by a test object.
     '''
+    __slots__ = ()
     PREFIX = 'mgroup'
-    appl_script_name = readonly_property('appl_script_name')
+    appl_script_name = readonly_property('appl_script_name', cached=True)
     mpair_count = readonly_property('mpair_count')
-    script_filename = readonly_property('script_filename')
+    script_filename = readonly_property('script_filename', cached=True)
     comment = property_factory('comment')
     console_e1_addr = property_factory('console_e1_addr')
     console_e1_protocol = property_factory('console_e1_protocol', CHR_PROTOCOL)
@@ -883,9 +1381,8 @@ class MGroup(HandleCHR):
     def copy(self, to_mgroup_handle: int, from_mgroup_handle: int):
         pass
 
-    @handle_api
     def delete(self):
-        self.handle = None
+        return self.delete_handle()
 
     @handle_api
     def get_e1_config_value(self, parameter: int):
@@ -895,6 +1392,10 @@ class MGroup(HandleCHR):
     def get_mpair(self, index: int) -> MPair:
         pass
 
+    @property
+    def mpairs(self):
+        return self.sequence('mpair_count', self.get_mpair)
+
     @handle_api
     def get_script_variable(self, name: str):
         pass
@@ -960,6 +1461,7 @@ class TracertPair(HandleCHR):
     You can specify the maximum hop count and maximum timeout value. You can
     also extract the runstatus while the traceroute is running.
     '''
+    __slots__ = ()
     PREFIX = 'tracert_pair'
     runStatus = readonly_property('runStatus', CHR_TRACERT_RUNSTATUS_TYPE)
     e1_addr = property_factory('e1_addr')
@@ -968,9 +1470,8 @@ class TracertPair(HandleCHR):
     max_timeout = property_factory('max_timeout')
     resolve_hop_name = property_factory('resolve_hop_name')
 
-    @handle_api
     def delete(self):
-        self.handle = None
+        return self.delete_handle()
 
     @handle_api
     def get_hop_record(self, index: int) -> HopRecord:
@@ -997,7 +1498,7 @@ class TracertPair(HandleCHR):
         pass
 
 
-class VoipPair(HandleCHR):
+class VoipPair(HandleCHR, ConfigMixin):
     '''
     VoIP Pair Object Functions
     ---------------------------------------------------------------------------
@@ -1010,6 +1511,7 @@ class VoipPair(HandleCHR):
     You can also get results for a VoIP test using
     CHR_timingrec_get_MOS_estimate or one of the CHR_pair_results functions.
     '''
+    __slots__ = ()
     PREFIX = 'voip_pair'
     codec = property_factory('codec', CHR_VOIP_CODEC)
     additional_delay = property_factory('additional_delay')
@@ -1041,7 +1543,7 @@ class VoipPair(HandleCHR):
         pass
 
 
-class VideoPair(HandleCHR):
+class VideoPair(HandleCHR, ConfigMixin):
     '''
     Video Pair Object Functions
     ---------------------------------------------------------------------------
@@ -1056,8 +1558,9 @@ class VideoPair(HandleCHR):
     A separate set of functions is provided to define and retrieve information
     about video multicast groups.
     '''
+    __slots__ = ()
     PREFIX = 'video_pair'
-    bitrate = readonly_property('bitrate')
+    bitrate = readonly_property('bitrate', cached=True)
     codec = property_factory('codec', CHR_VIDEO_CODEC)
     dest_port_num = property_factory('dest_port_num')
     initial_delay = property_factory('initial_delay')
@@ -1077,7 +1580,7 @@ class VideoPair(HandleCHR):
         pass
 
 
-class VideoMGroup(HandleCHR):
+class VideoMGroup(HandleCHR, ConfigMixin):
     '''
     Video Multicast Group Object Functions
     ---------------------------------------------------------------------------
@@ -1092,8 +1595,9 @@ class VideoMGroup(HandleCHR):
     A separate set of functions is provided to define and retrieve information
     about video pairs (unicast video).
     '''
+    __slots__ = ()
     PREFIX = 'video_mgroup'
-    bitrate = readonly_property('bitrate')
+    bitrate = readonly_property('bitrate', cached=True)
     codec = property_factory('codec', CHR_VIDEO_CODEC)
     initial_delay = property_factory('initial_delay')
     source_port_num = property_factory('source_port_num')
@@ -1112,7 +1616,7 @@ class VideoMGroup(HandleCHR):
         pass
 
 
-class HardwarePair(HandleCHR):
+class HardwarePair(HandleCHR, ConfigMixin):
     '''
     Hardware Performance Pair Object Functions
     ---------------------------------------------------------------------------
@@ -1123,6 +1627,7 @@ class HardwarePair(HandleCHR):
     get/set values in the Hardware Performance Pair Object as well
 
     '''
+    __slots__ = ()
     PREFIX = 'hardware_pair'
     line_rate = property_factory('line_rate')
     override_line_rate = property_factory('override_line_rate')
@@ -1134,7 +1639,8 @@ class HardwarePair(HandleCHR):
         pass
 
 
-class HardwareVoipPair(HandleCHR):
+class HardwareVoipPair(HandleCHR, ConfigMixin):
+    __slots__ = ()
     PREFIX = 'hardware_voip_pair'
     concurrent_voice_streams = property_factory('concurrent_voice_streams')
 
@@ -1154,6 +1660,7 @@ class AppGroup(HandleCHR):
     (such as FTP, which uses one connection for control and the other for data
      transfer).
     '''
+    __slots__ = ()
     PREFIX = 'app_group'
     pair_count = readonly_property('pair_count')
     event_count = readonly_property('event_count')
@@ -1172,17 +1679,15 @@ class AppGroup(HandleCHR):
     def copy(self, to_app_group_handle: int, from_app_group_handle: int):
         pass
 
-    @handle_api
     def delete(self):
-        self.handle = None
+        return self.delete_handle()
 
     @handle_api
     def save(self):
         pass
 
-    @handle_api
     def force_delete(self):
-        pass
+        return self.delete_handle('force_delete')
 
     @handle_api
     def add_pair(self, pair_handle: int):
@@ -1261,7 +1766,7 @@ class AppGroup(HandleCHR):
         pass
 
 
-class Channel(HandleCHR):
+class Channel(HandleCHR, ConfigMixin):
     '''
     IPTV Channel Object Functions
     ---------------------------------------------------------------------------
@@ -1273,8 +1778,9 @@ class Channel(HandleCHR):
     A related set of functions is provided for IPTV receiver objects and IPTV
     VPair objects.
     '''
+    __slots__ = ()
     PREFIX = 'channel'
-    bitrate = readonly_property('bitrate')
+    bitrate = readonly_property('bitrate', cached=True)
     codec = property_factory('codec', CHR_VIDEO_CODEC)
     comment = property_factory('comment')
     conn_send_buff_size = property_factory('conn_send_buff_size')
@@ -1293,9 +1799,8 @@ class Channel(HandleCHR):
     use_console_e1_values = property_factory('use_console_e1_values')
     lock = property_factory('lock')
 
-    @handle_api
     def delete(self):
-        self.handle = None
+        return self.delete_handle()
 
     @api
     def new(self):
@@ -1318,6 +1823,7 @@ class Report(BaseHandleCHR):
     be generated during each iteration.
     The REPORT_GROUP_ID field helps associate timing records with reports.
     '''
+    __slots__ = ()
     PREFIX = 'report'
     item_type = readonly_property('item_type', CHR_REPORT_ITEM)
     join_latency = readonly_property('join_latency')
@@ -1334,6 +1840,7 @@ class VPair(HandleCHR):
     A related set of commands is provided for IPTV channel objects and IPTV
     receiver objects.
     '''
+    __slots__ = ()
     PREFIX = 'vpair'
     report_count = readonly_property('report_count')
     timing_record_count = readonly_property('timing_record_count')
@@ -1343,9 +1850,8 @@ class VPair(HandleCHR):
     tr_duration = property_factory('tr_duration')
     lock = property_factory('lock')
 
-    @handle_api
     def delete(self):
-        self.handle = None
+        return self.delete_handle()
 
     @handle_api
     def get_report(self, i_report_index: int) -> Report:
@@ -1360,7 +1866,7 @@ class VPair(HandleCHR):
         pass
 
 
-class Receiver(HandleCHR):
+class Receiver(HandleCHR, ConfigMixin):
     '''
     IPTV Receiver Object Functions
     ---------------------------------------------------------------------------
@@ -1370,6 +1876,7 @@ class Receiver(HandleCHR):
     A related set of commands is provided for IPTV channel objects and IPTV
     VPair objects.
     '''
+    __slots__ = ()
     PREFIX = 'receiver'
     vpair_count = readonly_property('vpair_count')
     comment = property_factory('comment')
@@ -1390,14 +1897,17 @@ class Receiver(HandleCHR):
     def remove_vpair(self, i_pair_handle: int):
         pass
 
-    @handle_api
     def delete(self):
-        self.handle = None
+        return self.delete_handle()
 
     @handle_api
     def get_vpair(self, i_pair_index: int) -> VPair:
         pass
 
+    @property
+    def vpairs(self):
+        return self.sequence('vpair_count', self.get_vpair)
+
     @handle_api
     def is_disabled(self):
         pass
@@ -1411,6 +1921,73 @@ class Receiver(HandleCHR):
         pass
 
 
+# columns of Test.add_pairs_from_table, script variables are given by
+# VARIABLE_PREFIX columns or a script_variables column
+PAIR_COLUMNS = ('e1', 'e2', 'script', 'protocol', 'comment', 'qos')
+VARIABLE_PREFIX = 'var:'
+
+
+@lru_cache(maxsize=None)
+def find_script(directory, script):
+    """Return the path of *script*, its existence is checked once."""
+    if not osp.isabs(script):
+        script = osp.join(directory, 'Scripts', script)
+    if not osp.exists(script):
+        raise FileNotFoundError(f'Script is not found: {script}')
+    return script
+
+
+def parse_protocol(value):
+    if isinstance(value, str):
+        value = value.strip()
+        if not value.isdigit():
+            name = value.upper()
+            if not name.startswith('CHR_PROTOCOL_'):
+                name = f'CHR_PROTOCOL_{name}'
+            return CHR_PROTOCOL[name]
+    return int(value)
+
+
+def prepare_pair_row(row, directory):
+    """Check one table row, return (addresses, script, fields, variables)."""
+    row = dict(row)
+    try:
+        e1, e2, script = row.pop('e1'), row.pop('e2'), row.pop('script')
+    except KeyError as ex:
+        raise ValueError(f'Missing column {ex} in {row}') from None
+    fields = []
+    if 'protocol' in row:
+        fields.append(('protocol', parse_protocol(row.pop('protocol'))))
+    if 'comment' in row:
+        fields.append(('comment', str(row.pop('comment'))))
+    if 'qos' in row:
+        fields.append(('qos_name', str(row.pop('qos'))))
+    variables = dict(row.pop('script_variables', None) or {})
+    unknown = [x for x in row if not x.startswith(VARIABLE_PREFIX)]
+    if unknown:
+        raise ValueError(f'Unknown column {", ".join(unknown)} in {row}')
+    variables.update((k[len(VARIABLE_PREFIX):], v) for k, v in row.items())
+    variables = tuple((k, str(v)) for k, v in variables.items())
+    return (e1, e2), find_script(directory, script), tuple(fields), variables
+
+
+def add_table_pairs(test, rows):
+    """Create, configure and add the pairs of prepared rows."""
+    for (e1, e2), script, fields, variables in rows:
+        pair = Pair()
+        pair.e1_addr = e1
+        pair.e2_addr = e2
+        pair.use_script_filename(script)
+        for attr, value in fields:
+            setattr(pair, attr, value)
+        for name, value in variables:
+            pair.set_script_variable(name, value)
+        test.add_pair(pair)
+        # owned by the test now
+        pair.release_handle()
+    return len(rows)
+
+
 class Test(HandleCHR, IxiaNetworkMixin):
     '''
     Test Object Functions
@@ -1420,6 +1997,7 @@ class Test(HandleCHR, IxiaNetworkMixin):
     multicast groups to a test that has results. A test must have at least one
     pair or multicast group before it can be saved or run.
     '''
+    __slots__ = ()
     PREFIX = 'test'
     grouping = readonly_property('grouping')
     dgopts = readonly_property('dgopts', DatagramOptions)
@@ -1461,13 +2039,11 @@ class Test(HandleCHR, IxiaNetworkMixin):
     def clear_results(self):
         pass
 
-    @handle_api
     def delete(self):
-        self.handle = None
+        return self.delete_handle()
 
-    @handle_api
     def force_delete(self):
-        pass
+        return self.delete_handle('force_delete')
 
     @handle_api
     def get_mgroup(self, index: int) -> MGroup:
@@ -1477,6 +2053,39 @@ class Test(HandleCHR, IxiaNetworkMixin):
     def get_pair(self, index: int) -> Pair:
         pass
 
+    @property
+    def mgroups(self):
+        return self.sequence('mgroup_count', self.get_mgroup)
+
+    @property
+    def pairs(self):
+        return self.sequence('pair_count', self.get_pair)
+
+    def add_pairs_from_table(self, rows, chunk_size=256,
+                             columns=PAIR_COLUMNS):
+        """
+        Add a pair for each row of a table.
+
+        *rows* is an iterable of dicts or sequences, or a DataFrame, with
+        the columns e1, e2, script and optionally protocol (value or name),
+        comment and qos. Columns named var:<name>, or a script_variables
+        dict, set script variables, other columns raise ValueError. Sequence
+        rows are matched to *columns*. Relative scripts are looked up in the
+        Scripts directory. Rows are checked first and each chunk of
+        *chunk_size* pairs is built in one call. Returns the number of added
+        pairs.
+
+        A client of the bridge passes the table packed by common.pack_rows,
+        ``columns, rows = pack_rows(rows, PAIR_COLUMNS)``, so the rows are
+        not iterated remotely.
+        """
+        directory = self.api.chrapi.path
+        count = 0
+        for chunk in chunked(table_rows(rows, columns), chunk_size):
+            chunk = tuple(prepare_pair_row(x, directory) for x in chunk)
+            count += self.api.call(add_table_pairs, self, chunk)
+        return count
+
     @handle_api
     def load(self, test_file_name: str):
         pass
@@ -1521,6 +2130,10 @@ class Test(HandleCHR, IxiaNetworkMixin):
     def get_app_group_by_name(self, name: str) -> AppGroup:
         pass
 
+    @property
+    def app_groups(self):
+        return self.sequence('app_group_count', self.get_app_group_by_index)
+
     @handle_api
     def set_test_server_session(self,
                                 test_server_address: str,
@@ -1533,6 +2146,7 @@ class VTest(Test):
     '''
     IPTV Test Object Functions
     '''
+    __slots__ = ()
     channel_count = readonly_property('channel_count')
     receiver_count = readonly_property('receiver_count')
 
@@ -1567,3 +2181,71 @@ class VTest(Test):
     @handle_api
     def get_receiver_by_name(self, i_receiver_name: str) -> Receiver:
         pass
+
+    @property
+    def channels(self):
+        return self.sequence('channel_count', self.get_channel)
+
+    @property
+    def receivers(self):
+        return self.sequence('receiver_count', self.get_receiver)
+
+
+class TestTemplate:
+    """
+    A configured Test copied into new tests.
+
+    The run and datagram options and the handles of the template's pairs,
+    multicast groups and application groups are read on the first clone
+    and kept; call reload() after the template test changed. The members
+    are read and copied by common.read_members and common.add_members, as
+    the bridge's clone_test does.
+    """
+    OPTIONS = ('runopts', 'dgopts')
+
+    def __init__(self, test: Test):
+        self.test = test
+        self.options = None
+        self.members = None
+
+    def reload(self):
+        self.options = None
+        self.members = None
+
+    def load_members(self):
+        if self.members is None:
+            self.options = {x: getattr(self.test, x).config_items()
+                            for x in self.OPTIONS}
+            rc, members, where = read_members(BaseCHR.api.chrapi,
+                                              self.test.handle)
+            if rc != RetureCode.CHR_OK:
+                raise CallError(where, rc)
+            self.members = members
+        return self.members
+
+    def clone(self, addresses=None) -> Test:
+        """
+        Copy the template into a new Test in one batched call.
+
+        *addresses* gives (e1, e2) per pair to override the endpoint
+        addresses, None keeps the copied address. A failed call deletes the
+        new test and raises CallError, or CommitError for the options.
+        """
+        return BaseCHR.api.call(self.copy_members, addresses)
+
+    def copy_members(self, addresses):
+        members = self.load_members()
+        test = Test()
+        options = [getattr(test, x) for x in self.OPTIONS]
+        try:
+            with transaction(*options):
+                for obj, name in zip(options, self.OPTIONS):
+                    obj.from_dict(self.options[name])
+            rc, where = add_members(BaseCHR.api.chrapi, test.handle, members,
+                                    addresses)
+            if rc != RetureCode.CHR_OK:
+                raise CallError(where, rc)
+        except BaseException:
+            test.delete()
+            raise
+        return test
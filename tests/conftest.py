@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 21:14:05 2026
+
+@author: 皓
+
+A dict-backed CHRAPI for the wrapper tests, which run without ChrApi.dll.
+"""
+import re
+import sys
+import types
+import itertools
+import os.path as osp
+import pytest
+
+ROOT = osp.dirname(osp.dirname(osp.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+try:
+    import winreg  # noqa: F401  pylint: disable=unused-import
+except ImportError:
+    # utils reads the install path from the registry, absent off Windows
+    winreg = types.ModuleType('winreg')
+    winreg.HKEY_LOCAL_MACHINE = winreg.KEY_WOW64_32KEY = winreg.KEY_READ = 0
+
+    def open_key(*args, **kwargs):
+        raise FileNotFoundError('no registry')
+
+    winreg.OpenKey = open_key
+    winreg.QueryValueEx = open_key
+    sys.modules['winreg'] = winreg
+
+from pychariot import wrapper  # noqa: E402  pylint: disable=wrong-import-position
+
+CHR_OK = 0
+CHR_HANDLE_INVALID = 113
+# containers of the fake, {add function: (count function, get function)}
+CONTAINERS = {'add_pair': ('get_pair_count', 'get_pair'),
+              'add_mgroup': ('get_mgroup_count', 'get_mgroup'),
+              'add_mpair': ('get_mpair_count', 'get_mpair')}
+
+
+class FakeCHRAPI:
+    '''
+    CHR functions backed by dicts.
+
+    Objects are created by *_new, fields are kept by *_get_*/*_set_*, and
+    the add functions above keep their members. Every call is logged in
+    calls, deleted handles in deleted.
+    '''
+
+    def __init__(self, path=None, version=None):
+        self.path = path
+        self.version = version
+        self.reset()
+
+    def reset(self):
+        self.handles = itertools.count(100)
+        self.objects = {}
+        self.calls = []
+        self.deleted = []
+
+    def has_func(self, name):
+        return name.startswith('CHR_')
+
+    def __dir__(self):
+        return ['CHR_pair_get_e1_addr']
+
+    def __getattr__(self, name):
+        match = re.match(r'CHR_(\w+?)_(new|delete|force_delete|add_\w+|'
+                         r'get_\w+|set_\w+|\w+)$', name)
+        if match is None:
+            raise AttributeError(name)
+        kind, action = match.groups()
+
+        def func(*args):
+            self.calls.append((name, args))
+            return self.call(kind, action, args)
+        func.__name__ = name
+        return func
+
+    def call(self, kind, action, args):
+        if action == 'new':
+            handle = next(self.handles)
+            self.objects[handle] = {'kind': kind}
+            return CHR_OK, handle
+        if kind == 'api':
+            return (CHR_OK, '') if action == 'initialize' else CHR_OK
+        obj = self.objects.get(args[0]) if args else None
+        if obj is None:
+            return CHR_HANDLE_INVALID if action.startswith(
+                ('set_', 'add_', 'delete', 'force_delete')) else (
+                    CHR_HANDLE_INVALID, None)
+        if action in ('delete', 'force_delete'):
+            del self.objects[args[0]]
+            self.deleted.append(args[0])
+            return CHR_OK
+        for add, (count, get) in CONTAINERS.items():
+            if action == add:
+                obj.setdefault(get, []).append(args[1])
+                return CHR_OK
+            if action == count:
+                return CHR_OK, len(obj.get(get, ()))
+            if action == get:
+                return CHR_OK, obj.get(get, [])[args[1]]
+        if action == 'use_script_filename':
+            obj['script_filename'] = args[1]
+            return CHR_OK
+        if action in ('get_runopts', 'get_dgopts'):
+            if action not in obj:
+                obj[action] = self.call(action[4:], 'new', ())[1]
+            return CHR_OK, obj[action]
+        if action.startswith('set_'):
+            obj[action[4:]] = args[-1]
+            return CHR_OK
+        if action.startswith('get_'):
+            # unset fields read as None, not as a value of any enum
+            default = 0 if action.endswith('_count') else None
+            return CHR_OK, obj.get(action[4:], default)
+        return CHR_OK
+
+
+@pytest.fixture(scope='session')
+def api_wrapper():
+    wrapper.CHRAPI = FakeCHRAPI
+    return wrapper.CHRAPIWrapper('/fake', '7.10')
+
+
+@pytest.fixture
+def chrapi(api_wrapper):
+    '''清空假CHRAPI和wrapper的全局状态'''
+    for state in (wrapper.HANDLE_OBJECTS, wrapper.RELEASE_QUEUE,
+                  wrapper.STAGED_WRITES, wrapper.CONFIG_CACHE):
+        state.clear()
+    api_wrapper.chrapi.reset()
+    return api_wrapper.chrapi
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 01:02:44 2026
+
+@author: 皓
+"""
+import socket
+import pytest
+from pychariot import bridge
+
+rpyc = pytest.importorskip('rpyc')
+
+
+@pytest.mark.skipif(not hasattr(socket, 'AF_UNIX'),
+                    reason='Unix domain sockets are not available')
+def test_serve_unix_accepts_at_once(tmp_path):
+    path = str(tmp_path / 'bridge.sock')
+    assert bridge.serve_unix(path) == path
+    conn = rpyc.classic.unix_connect(path)
+    try:
+        assert conn.modules.os.getpid() > 0
+    finally:
+        conn.close()
+        bridge._SERVERS.pop(path).close()  # pylint: disable=protected-access
@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 01:20:17 2026
+
+@author: 皓
+"""
+import types
+import pytest
+from pychariot import chariot
+from pychariot.chariot import Chariot
+
+
+class PipServer:
+    '''记录pip_install调用的rpc_server'''
+
+    def __init__(self, result):
+        self.result = result
+        self.installed = []
+
+    def pip_install(self, whl):
+        self.installed.append(whl)
+        return self.result
+
+    def stop(self):
+        pass
+
+
+@pytest.fixture
+def bridge_client(tmp_path, monkeypatch):
+    whl = tmp_path / 'pychariot32-0.0.0-py3-none-any.whl'
+    whl.write_bytes(b'wheel')
+    monkeypatch.setattr(chariot, 'CACHE_DIR', str(tmp_path / 'cache'))
+    client = Chariot()
+    client.get_pychariot32_path = lambda: str(whl)
+    client.python = types.SimpleNamespace(__version__='3.8.0')
+    return client
+
+
+def test_marker_keyed_by_bridge_version(bridge_client, monkeypatch):
+    bridge_client.rpc_server = PipServer(0)
+    bridge_client.install_pychariot32()
+    bridge_client.install_pychariot32()
+    assert len(bridge_client.rpc_server.installed) == 1
+    assert bridge_client.is_install_current()
+    monkeypatch.setattr(chariot, 'BRIDGE_VERSION', (9, 9, 9))
+    assert not bridge_client.is_install_current()
+    bridge_client.install_pychariot32()
+    assert len(bridge_client.rpc_server.installed) == 2
+
+
+@pytest.mark.parametrize('result', [1, False,
+                                    types.SimpleNamespace(returncode=2)])
+def test_failed_install_keeps_no_marker(bridge_client, result):
+    bridge_client.rpc_server = PipServer(result)
+    with pytest.raises(RuntimeError):
+        bridge_client.install_pychariot32()
+    assert bridge_client.read_marker() is None
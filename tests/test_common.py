@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 21:41:12 2026
+
+@author: 皓
+"""
+import pytest
+from pychariot.common import ChunkedSequence, pack_rows, get_function
+
+
+def make_sequence(count, chunk_size):
+    calls = []
+
+    def fetch(start, stop):
+        calls.append((start, stop))
+        return [x * 10 for x in range(start, stop)]
+    return ChunkedSequence(lambda: count, fetch, chunk_size), calls
+
+
+def test_chunked_sequence_loads_chunks_once():
+    items, calls = make_sequence(10, 4)
+    assert items[5] == 50
+    assert items[-1] == 90
+    assert items[4] == 40
+    assert calls == [(4, 8), (8, 10)]
+    assert list(items) == [x * 10 for x in range(10)]
+    assert calls == [(4, 8), (8, 10), (0, 4)]
+
+
+def test_chunked_sequence_slices():
+    items, _ = make_sequence(10, 4)
+    assert items[2:7] == (20, 30, 40, 50, 60)
+    assert items[::-3] == (90, 60, 30, 0)
+    assert items[20:] == ()
+    with pytest.raises(IndexError):
+        items[10]  # pylint: disable=pointless-statement
+
+
+def test_pack_rows():
+    rows = [{'e1': '10.0.0.1', 'e2': '10.0.0.2', 'script': 'a.scr'},
+            ('10.0.0.3', '10.0.0.4', 'b.scr', 2),
+            {'e1': '10.0.0.5', 'e2': None, 'var:size': 100,
+             'script_variables': {'port': 5000}}]
+    columns, packed = pack_rows(rows, ('e1', 'e2', 'script', 'protocol'))
+    assert columns == ('e1', 'e2', 'script', 'protocol', 'var:size',
+                       'script_variables')
+    assert packed == (
+        ('10.0.0.1', '10.0.0.2', 'a.scr', None, None, None),
+        ('10.0.0.3', '10.0.0.4', 'b.scr', 2, None, None),
+        ('10.0.0.5', None, None, None, 100, (('port', 5000),)))
+
+
+class PairApi:
+    '''只有地址函数的api'''
+    functions = frozenset(('CHR_pair_get_e1_addr', 'CHR_pair_get_e2_addr',
+                           'CHR_pair_set_e1_addr', 'CHR_pair_set_e2_addr'))
+
+    def __init__(self):
+        self.addresses = {'e1': '10.0.0.1', 'e2': '10.0.0.2'}
+
+    def __getattr__(self, name):
+        if name not in self.functions:
+            raise AttributeError(name)
+        end = name[-7:-5]
+
+        def func(pair, addr=None):
+            if addr is None:
+                return 0, self.addresses[end]
+            self.addresses[end] = addr
+            return 0
+        return func
+
+
+def test_swap_fallback():
+    api = PairApi()
+    swap = get_function(api, 'CHR_pair_swap_endpoints')
+    assert swap.__name__ == 'CHR_pair_swap_endpoints'
+    assert swap(1) == 0
+    assert api.addresses == {'e1': '10.0.0.2', 'e2': '10.0.0.1'}
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 01:34:50 2026
+
+@author: 皓
+"""
+import pytest
+from pychariot.serialize import pack, unpack, HEADER, MAGIC
+
+
+@pytest.mark.parametrize('compress', [False, True])
+def test_numbers_round_trip(compress):
+    blob = pack([1, 2, -3, 1 << 40], compress=compress)
+    assert HEADER.unpack_from(blob)[:3] == (MAGIC, b'a', b'q')
+    assert list(unpack(blob)) == [1, 2, -3, 1 << 40]
+    assert list(unpack(pack([0.5, 2]))) == [0.5, 2.0]
+
+
+def test_strings_round_trip():
+    values = ('10.0.0.1', '', 'Ω')
+    assert unpack(pack(values)) == values
+    assert unpack(pack(values, compress=True)) == values
+
+
+def test_numpy_round_trip():
+    np = pytest.importorskip('numpy')
+    values = np.arange(12, dtype=np.int32).reshape(3, 4)
+    result = unpack(pack(values, compress=True))
+    assert result.dtype == values.dtype
+    assert (result == values).all()
+    assert (unpack(pack([1, 2]), as_numpy=True) == np.array([1, 2])).all()
+
+
+def test_invalid_header():
+    with pytest.raises(ValueError):
+        unpack(b'XXXX' + pack([1])[4:])
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 23:48:12 2026
+
+@author: 皓
+"""
+import pytest
+from pychariot.const import CHR_PROTOCOL
+from pychariot.spec import compile_spec
+
+SPEC = {'runopts': {'test_duration': 60},
+        'pairs': [{'e1_addr': '10.0.0.1', 'e2_addr': '10.0.0.2',
+                   'script': 'C:/Scripts/Throughput.scr', 'protocol': 'TCP'}]}
+
+
+def calls(chrapi, prefix):
+    return [x for x in chrapi.calls if x[0].startswith(prefix)]
+
+
+def test_protocol_coerced():
+    spec = compile_spec(SPEC)
+    assert spec.pairs[0][0]['protocol'] is CHR_PROTOCOL.CHR_PROTOCOL_TCP
+    with pytest.raises(ValueError):
+        compile_spec({'pairs': [{'protocl': 2}]})
+
+
+def test_apply_to_existing_test(chrapi):
+    test = compile_spec(SPEC).apply()
+    handles = [x.handle for x in test.pairs]
+    del chrapi.calls[:]
+    spec = dict(SPEC, runopts={'test_duration': 90})
+    # the same script by another path
+    spec['pairs'] = [dict(SPEC['pairs'][0],
+                          script='C:/Scripts/./Throughput.scr')]
+    compile_spec(spec).apply(test)
+    assert [x.handle for x in test.pairs] == handles
+    assert chrapi.deleted == []
+    # one read of the changed field, one write
+    assert len(calls(chrapi, 'CHR_runopts_get_')) == 1
+    assert calls(chrapi, 'CHR_runopts_set_') == [
+        ('CHR_runopts_set_test_duration', (test.runopts.handle, 90))]
+
+
+def test_unchanged_spec_no_operations(chrapi):
+    test = compile_spec(SPEC).apply()
+    assert compile_spec(SPEC).operations(test) == []
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Tue Oct 20 00:31:26 2026
+
+@author: 皓
+"""
+from pychariot.const import RetureCode
+from pychariot.waiter import Waiter
+
+
+class Owner:
+    '''Waiter的chariot, 记录错误'''
+
+    def __init__(self):
+        self.errors = []
+
+    def show_error(self, handle, code, where):
+        self.errors.append((handle, code, where))
+
+
+def counting_query(calls, stop_after):
+    def query(handle, timeout):
+        calls[handle] = calls.get(handle, 0) + 1
+        if calls[handle] >= stop_after:
+            return RetureCode.CHR_OK
+        return RetureCode.CHR_TIMED_OUT
+    return query
+
+
+def test_only_due_watches_polled():
+    owner = Owner()
+    waiter = Waiter(owner, min_interval=0.01, max_interval=5.0)
+    calls = {}
+    query = counting_query(calls, 8)
+    # long expected duration, polled again after max_interval only
+    slow = waiter.watch('slow', query, 1, expected=100)
+    fast = waiter.watch('fast', query, 2, expected=0)
+    assert fast.result(timeout=5) is True
+    assert calls[2] == 8
+    assert calls[1] == 1
+    waiter.cancel_all()
+    assert slow.cancelled()
+    assert owner.errors == []
+
+
+def test_timeout_and_error():
+    owner = Owner()
+    waiter = Waiter(owner, min_interval=0.01, max_interval=0.05)
+    timed_out = waiter.watch('query', counting_query({}, 1000), 1,
+                             timeout=0.1)
+    failed = waiter.watch('query', lambda handle, timeout: 5, 2)
+    assert timed_out.result(timeout=5) is False
+    assert failed.result(timeout=5) is False
+    assert sorted(x[0] for x in owner.errors) == [1, 2]
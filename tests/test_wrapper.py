@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+Created on Mon Oct 19 21:20:37 2026
+
+@author: 皓
+"""
+import gc
+import weakref
+import pytest
+from pychariot import wrapper
+from pychariot.common import pack_rows
+from pychariot.const import CHR_TEST_END
+from pychariot.wrapper import Pair, release_pending
+
+
+def test_owned_handle_released(chrapi):
+    pair = Pair()
+    handle = pair.handle
+    del pair
+    gc.collect()
+    assert release_pending() == 1
+    assert chrapi.deleted == [handle]
+
+
+def test_contained_pair_not_released(chrapi):
+    test = wrapper.Test()
+    pair = Pair()
+    test.add_pair(pair)
+    handle = pair.handle
+    del pair
+    gc.collect()
+    # a wrapper of the contained pair is dropped as well
+    assert test.get_pair(0).handle == handle
+    gc.collect()
+    other = Pair()
+    assert not wrapper.RELEASE_QUEUE
+    assert chrapi.deleted == []
+    assert other.owned
+    assert [x.handle for x in test.pairs] == [handle]
+
+
+def test_failed_delete_keeps_handle(chrapi):
+    pair = Pair()
+    handle = pair.handle
+    chrapi.objects.pop(handle)
+    assert pair.delete() != 0
+    assert pair.handle == handle
+
+
+def test_transaction_of_new_wrapper_staged(chrapi):
+    test = wrapper.Test()
+    with test.dgopts.transaction():
+        test.dgopts.TTL = 9
+        assert test.dgopts.TTL == 9
+        assert not [x for x in chrapi.calls if x[0] == 'CHR_dgopts_set_TTL']
+    assert [x for x in chrapi.calls if x[0] == 'CHR_dgopts_set_TTL']
+    assert test.dgopts.TTL == 9
+    assert not wrapper.STAGED_WRITES
+
+
+def test_staged_read_decoded(chrapi):
+    runopts = wrapper.Test().runopts
+    with runopts.transaction():
+        runopts.test_end = 3
+        assert runopts.test_end is CHR_TEST_END.CHR_TEST_END_AFTER_FIXED_DURATION
+
+
+def test_transaction_cleared_on_error(chrapi):
+    test = wrapper.Test()
+    try:
+        with test.dgopts.transaction():
+            test.dgopts.TTL = 9
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    assert not wrapper.STAGED_WRITES
+    assert test.dgopts.TTL is None
+
+
+def test_begin_does_not_keep_object(chrapi):
+    pair = Pair()
+    ref = weakref.ref(pair)
+    pair.begin()
+    del pair
+    gc.collect()
+    assert ref() is None
+
+
+def test_config_items_plain(chrapi):
+    runopts = wrapper.Test().runopts
+    runopts.test_end = CHR_TEST_END.CHR_TEST_END_AFTER_FIXED_DURATION
+    items = runopts.config_items()
+    assert isinstance(items, tuple)
+    assert type(dict(items)['test_end']) is int
+    other = wrapper.Test().runopts
+    other.from_dict(items)
+    assert other.test_end is CHR_TEST_END.CHR_TEST_END_AFTER_FIXED_DURATION
+
+
+def test_pairs_from_packed_table(chrapi, tmp_path):
+    script = tmp_path / 'a.scr'
+    script.write_text('')
+    rows = [{'e1': '10.0.0.1', 'e2': '10.0.0.2', 'script': str(script),
+             'protocol': 'tcp', 'var:file_size': 1000}]
+    columns, rows = pack_rows(rows, wrapper.PAIR_COLUMNS)
+    test = wrapper.Test()
+    assert test.add_pairs_from_table(rows, columns=columns) == 1
+    assert ('CHR_pair_set_script_variable',
+            (test.pairs[0].handle, 'file_size', '1000')) in chrapi.calls
+
+
+def test_pairs_table_unknown_column(chrapi, tmp_path):
+    script = tmp_path / 'a.scr'
+    script.write_text('')
+    rows = [{'e1': '10.0.0.1', 'e2': '10.0.0.2', 'script': str(script),
+             'protcol': 'tcp'}]
+    with pytest.raises(ValueError):
+        wrapper.Test().add_pairs_from_table(rows)
+    assert not [x for x in chrapi.calls if x[0] == 'CHR_pair_new']
+
+
+def test_template_clone(chrapi):
+    test = wrapper.Test()
+    for _ in range(2):
+        test.add_pair(Pair())
+    clone = wrapper.TestTemplate(test).clone((('10.0.0.1', None),))
+    pairs = clone.pairs
+    assert len(pairs) == 2
+    assert pairs[0].e1_addr == '10.0.0.1'
+    assert pairs[1].e1_addr is None
+
+
+def test_config_cache_shared_by_handle(chrapi):
+    test = wrapper.Test()
+    test.runopts.cache_config()
+    test.runopts.test_duration = 30
+    del chrapi.calls[:]
+    assert test.runopts.test_duration == 30
+    assert test.runopts.test_duration == 30
+    assert len([x for x in chrapi.calls
+                if x[0] == 'CHR_runopts_get_test_duration']) == 1